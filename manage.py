@@ -7,6 +7,8 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rrm_project.settings')
+    # Commands get the batch database tuning; the dev server is a web process
+    os.environ.setdefault('DB_PROFILE', 'web' if sys.argv[1:2] == ['runserver'] else 'batch')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
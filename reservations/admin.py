@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    Profile, Branch, Table, MenuItem, Reservation, WaitlistEntry, AuditLog
+    Profile, Branch, Table, MenuItem, Reservation, WaitlistEntry, AuditLog, Job
 )
 
 @admin.register(Profile)
@@ -24,8 +24,17 @@ class MenuItemAdmin(admin.ModelAdmin):
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
-    list_display = ('id','customer','branch','table','party_size','date','time','status')
+    list_display = ('id','customer','branch','table','party_size','date','time','duration','status')
     list_filter = ('status','branch','date')
 
-admin.site.register(WaitlistEntry)
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('reservation', 'branch', 'date', 'time', 'rank')
+    list_filter = ('branch', 'date')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'idempotency_key')
+    list_filter = ('status', 'name')
+
 admin.site.register(AuditLog)
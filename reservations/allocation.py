@@ -1,17 +1,254 @@
 # reservations/allocation.py
-from .models import Table, Reservation
-from django.db.models import Q
-
-def find_best_table(branch, party_size, date, time):
-    """
-    Basic best-fit: smallest table with capacity >= party_size that is free at date/time.
-    If none, returns None.
-    """
-    # Candidate tables that are available and capacity >= party_size
-    candidates = Table.objects.filter(branch=branch, status='available', capacity__gte=party_size).order_by('capacity')
-    for table in candidates:
-        conflict = Reservation.objects.filter(table=table, date=date, time=time, status__in=['pending','confirmed']).exists()
-        if not conflict:
-            return table
-    # No single table fits; optionally we might try combine tables (not implemented here)
-    return None
+from .models import Branch, Table, Reservation, DEFAULT_DURATION, compute_end_time
+from .availability import (
+    BranchTables, availability_index, load_tables, load_days, best_table, best_combination,
+    slot_grid, to_seconds,
+)
+from . import rollups
+from .analytics import bump_stats_version
+import datetime
+import time as _time
+from asgiref.sync import sync_to_async
+from collections import namedtuple
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+
+BatchResult = namedtuple('BatchResult', ['reservations', 'waitlisted'])
+SlotGrid = namedtuple('SlotGrid', ['first', 'step', 'slots', 'last_modified'])
+
+
+def lock_branch(branch_id):
+    """
+    Serialize bookings for one branch until the surrounding transaction ends.
+
+    Takes a row lock on the branch (SELECT ... FOR UPDATE), which is what makes
+    allocate-then-save atomic on PostgreSQL. SQLite ignores FOR UPDATE; there the
+    IMMEDIATE transaction mode in settings takes the write lock at BEGIN instead.
+    """
+    list(Branch.objects.select_for_update().filter(pk=branch_id).values_list('pk', flat=True))
+
+
+def book(reservation, attempts=3):
+    """
+    Allocate tables for an unsaved reservation and save it as one atomic unit.
+
+    Allocation runs under lock_branch(), so two concurrent requests can't both
+    take the same table. If the insert still trips unique_table_booking (a
+    backend without row locks, or a cancelled or completed booking at the same
+    start time, which the constraint still covers) we retry without that table,
+    so the next best one is tried; once attempts run out the booking goes to
+    the waitlist. Returns the tables given, empty when waitlisted.
+    """
+    failed = set()
+    for _ in range(attempts):
+        tables = []
+        try:
+            with transaction.atomic():
+                lock_branch(reservation.branch_id)
+                tables = allocate(reservation.branch, reservation.party_size, reservation.date,
+                                  reservation.time, reservation.duration, exclude=failed)
+                _save_booking(reservation, tables)
+                return tables
+        except IntegrityError:
+            if tables:
+                failed.add(tables[0].pk)
+            reservation.pk = None
+            reservation._state.adding = True
+    with transaction.atomic():
+        _save_booking(reservation, [])
+    return []
+
+
+def _save_booking(reservation, tables):
+    from .waitlist import enqueue  # waitlist imports this module
+
+    reservation.table = tables[0] if tables else None
+    reservation.status = 'confirmed' if tables else 'pending'
+    reservation.save()
+    if len(tables) > 1:
+        reservation.joined_tables.set(tables[1:])
+    if not tables:
+        enqueue(reservation)
+
+
+def allocate(branch, party_size, date, time, duration=DEFAULT_DURATION, exclude=()):
+    """
+    Tables for a booking: the best single table, else the smallest group of
+    adjacent tables that seats the party. The first table is the one to put on
+    Reservation.table, the rest go to joined_tables. Empty list if nothing fits.
+    Tables whose pk is in `exclude` are never picked.
+    """
+    table = find_best_table(branch, party_size, date, time, duration, exclude)
+    if table:
+        return [table]
+    return find_best_combination(branch, party_size, date, time, duration, exclude) or []
+
+
+def find_best_table(branch, party_size, date, time, duration=DEFAULT_DURATION, exclude=()):
+    """
+    Basic best-fit: smallest table with capacity >= party_size that is free
+    for the whole stay (time .. time + duration minutes). Two bookings clash
+    when their intervals overlap. If none, returns None.
+
+    Outside a transaction the answer comes from the in-memory availability
+    index. Inside one (or with tables to exclude) we go to the database so
+    uncommitted writes are seen and never end up cached.
+    """
+    end_time = compute_end_time(time, duration)
+    if exclude or transaction.get_connection().in_atomic_block:
+        return _find_best_table_query(branch, party_size, date, time, end_time, exclude)
+    return availability_index.free_table(branch.pk, party_size, date, time, end_time)
+
+
+def find_best_combination(branch, party_size, date, time, duration=DEFAULT_DURATION, exclude=()):
+    """
+    Smallest group of adjacent free tables (by floorplan x/y) whose total
+    capacity seats party_size, largest table first. None if no group fits.
+    """
+    end_time = compute_end_time(time, duration)
+    if exclude or transaction.get_connection().in_atomic_block:
+        return _find_best_combination_query(branch, party_size, date, time, end_time, exclude)
+    return availability_index.free_combination(branch.pk, party_size, date, time, end_time)
+
+
+def booking_slots():
+    """(first slot, step, number of slots) from the BOOKING_* settings, in seconds."""
+    first = to_seconds(datetime.time.fromisoformat(getattr(settings, 'BOOKING_FIRST_SEATING', '11:00')))
+    last = to_seconds(datetime.time.fromisoformat(getattr(settings, 'BOOKING_LAST_SEATING', '22:00')))
+    step = getattr(settings, 'BOOKING_SLOT_MINUTES', 15) * 60
+    return first, step, (last - first) // step + 1
+
+
+def day_availability(branch, date, party_size, duration=DEFAULT_DURATION):
+    """
+    Every bookable start time of the day for a party, as a SlotGrid: `slots`
+    is a list of booleans for first, first + step, ... (seconds since
+    midnight) and `last_modified` a timestamp of the data it came from.
+    """
+    first, step, count = booking_slots()
+    if transaction.get_connection().in_atomic_block:
+        tables = load_tables([branch.pk])
+        day = load_days(tables, [(branch.pk, date)])[(branch.pk, date)]
+        grid = slot_grid(tables[branch.pk], day, party_size, first, step, count, duration * 60)
+        last_modified = _time.time()
+    else:
+        grid, last_modified = availability_index.open_slots(
+            branch.pk, date, party_size, first, step, count, duration * 60
+        )
+    return SlotGrid(first, step, [bool(grid >> i & 1) for i in range(count)], last_modified)
+
+
+# ---- async variants (ASGI views) ----
+# The async ORM can't open transactions, so reads go through the index with
+# async queries while the locked write in book() runs in a worker thread.
+
+async def aallocate(branch, party_size, date, time, duration=DEFAULT_DURATION):
+    table = await afind_best_table(branch, party_size, date, time, duration)
+    if table:
+        return [table]
+    return await afind_best_combination(branch, party_size, date, time, duration) or []
+
+
+async def afind_best_table(branch, party_size, date, time, duration=DEFAULT_DURATION):
+    end_time = compute_end_time(time, duration)
+    return await availability_index.afree_table(branch.pk, party_size, date, time, end_time)
+
+
+async def afind_best_combination(branch, party_size, date, time, duration=DEFAULT_DURATION):
+    end_time = compute_end_time(time, duration)
+    return await availability_index.afree_combination(branch.pk, party_size, date, time, end_time)
+
+
+abook = sync_to_async(book)
+
+
+def _overlapping(date, time, end_time):
+    return Q(date=date, time__lt=end_time, end_time__gt=time, status__in=Reservation.ACTIVE_STATUSES)
+
+
+def _find_best_table_query(branch, party_size, date, time, end_time, exclude=()):
+    """
+    Single query version: overlapping bookings are excluded with NOT EXISTS
+    anti-joins, so the cost doesn't grow with the number of tables in the branch.
+    """
+    booked = Reservation.objects.filter(_overlapping(date, time, end_time), table=OuterRef('pk'))
+    joined = Reservation.objects.filter(_overlapping(date, time, end_time), joined_tables=OuterRef('pk'))
+    return (
+        Table.objects.filter(branch=branch, status='available', capacity__gte=party_size)
+        .filter(~Exists(booked), ~Exists(joined))
+        .exclude(pk__in=exclude)
+        .order_by('capacity', 'pk')
+        .first()
+    )
+
+
+def _find_best_combination_query(branch, party_size, date, time, end_time, exclude=()):
+    tables = load_tables([branch.pk])
+    if exclude:
+        tables[branch.pk] = BranchTables([t for t in tables[branch.pk].tables if t.pk not in exclude])
+    day = load_days(tables, [(branch.pk, date)])[(branch.pk, date)]
+    return best_combination(tables[branch.pk], day, party_size, time, end_time)
+
+
+def allocate_batch(requests):
+    """
+    Allocate many bookings at once, e.g. an event or a migration import.
+
+    `requests` is a list of dicts with customer, branch, party_size, date,
+    time and optionally duration and notes. Bigger parties are placed first
+    (then by date/time) against one in-memory snapshot of the affected days,
+    which is updated as tables are handed out, and everything is written with
+    bulk_create in a single transaction.
+
+    Returns BatchResult: `reservations` in input order and `waitlisted`, the
+    input indices that got no table and were saved as pending and queued.
+    """
+    reservations = []
+    for req in requests:
+        res = Reservation(status='pending', **req)
+        res.end_time = compute_end_time(res.time, res.duration)
+        reservations.append(res)
+    keys = {(res.branch_id, res.date) for res in reservations}
+    order = sorted(
+        range(len(reservations)),
+        key=lambda i: (-reservations[i].party_size, reservations[i].date, reservations[i].time),
+    )
+
+    from .waitlist import enqueue_many
+
+    with transaction.atomic():
+        tables = load_tables({branch_id for branch_id, _ in keys})
+        days = load_days(tables, keys)
+        joined, waitlisted = [], []
+        for i in order:
+            res = reservations[i]
+            branch_tables, day = tables[res.branch_id], days[(res.branch_id, res.date)]
+            table = best_table(branch_tables, day, res.party_size, res.time, res.end_time)
+            found = [table] if table else best_combination(
+                branch_tables, day, res.party_size, res.time, res.end_time
+            )
+            if not found:
+                waitlisted.append(i)
+                continue
+            res.table = found[0]
+            res.status = 'confirmed'
+            joined.append((res, found[1:]))
+            for t in found:
+                # Placeholder id: the row has no pk until bulk_create
+                day.add(('batch', i), res.time, res.end_time, t.pk, branch_tables.bits)
+
+        Reservation.objects.bulk_create(reservations, batch_size=500)
+        rollups.added(reservations)
+        enqueue_many([reservations[i] for i in sorted(waitlisted)])
+        Reservation.joined_tables.through.objects.bulk_create([
+            Reservation.joined_tables.through(reservation_id=res.pk, table_id=t.pk)
+            for res, extra in joined for t in extra
+        ], batch_size=500)
+        # bulk_create sends no signals, so drop the cached days and stats ourselves
+        for branch_id, date in keys:
+            transaction.on_commit(lambda b=branch_id, d=date: availability_index.invalidate(b, d))
+        for branch_id in {branch_id for branch_id, _ in keys}:
+            transaction.on_commit(lambda b=branch_id: bump_stats_version(b))
+
+    return BatchResult(reservations, sorted(waitlisted))
@@ -0,0 +1,138 @@
+# reservations/analytics.py
+"""
+Reservation statistics shared by the manager dashboard and the analytics APIs.
+
+Everything comes from one query over the daily rollups (see rollups.py):
+rows are grouped by (date, branch) with one conditional sum per status, and
+the per-day, per-branch and per-status views are folded from that result.
+Callers pass a date range and optionally a branch, so a request only reads
+the rollup rows it needs.
+
+cached_reservation_stats() keeps results in the default cache under keys
+that include a per-branch version number (plus one for all branches).
+Reservation writes bump the versions once committed (signals.py, and the
+bulk writers themselves), so a cached result is never served after the
+numbers behind it changed. Results that go into the cache are always read
+from the primary, even in views that otherwise read from a replica: a
+lagging replica's numbers would be stored under the new version and served
+until they expire.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import DailyRollup, Reservation
+
+STATUSES = [value for value, _ in Reservation.STATUS_CHOICES]
+
+
+def default_date_from():
+    days = getattr(settings, 'ANALYTICS_DEFAULT_DAYS', 90)
+    return timezone.localdate() - datetime.timedelta(days=days)
+
+
+def reservation_stats(date_from=None, date_to=None, branch=None, using=None):
+    """
+    Reservation counts between date_from and date_to (inclusive; date_from
+    defaults to ANALYTICS_DEFAULT_DAYS ago, date_to to no limit), optionally
+    for one branch (a Branch or its id) or a list of branch ids, read from
+    database `using` (default: wherever the router sends it).
+
+    Returns {'per_day': [{'date', 'count'}], 'per_branch': [{'branch_id',
+    'branch__name', 'count'}], 'per_status': {status: count}}. One query.
+    """
+    rows = DailyRollup.objects.using(using).filter(date__gte=date_from or default_date_from())
+    if date_to:
+        rows = rows.filter(date__lte=date_to)
+    if isinstance(branch, list):
+        rows = rows.filter(branch_id__in=branch)
+    elif branch:
+        rows = rows.filter(branch=branch)
+    rows = (
+        rows.values('date', 'branch_id', 'branch__name')
+        .annotate(**{
+            status: Sum('count', filter=Q(status=status), default=0) for status in STATUSES
+        })
+        .order_by('date', 'branch__name')
+    )
+
+    per_day, per_branch, per_status = {}, {}, dict.fromkeys(STATUSES, 0)
+    for row in rows:
+        total = sum(row[status] for status in STATUSES)
+        if not total:
+            continue
+        per_day[row['date']] = per_day.get(row['date'], 0) + total
+        key = (row['branch__name'], row['branch_id'])
+        per_branch[key] = per_branch.get(key, 0) + total
+        for status in STATUSES:
+            per_status[status] += row[status]
+
+    return {
+        'per_day': [{'date': date, 'count': n} for date, n in per_day.items()],
+        'per_branch': [
+            {'branch_id': branch_id, 'branch__name': name, 'count': n}
+            for (name, branch_id), n in sorted(per_branch.items())
+        ],
+        'per_status': per_status,
+    }
+
+
+def cache_timeout():
+    return getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 300)
+
+
+def _version_key(branch_id):
+    return f'analytics:version:{branch_id or "all"}'
+
+
+def stats_version(branch_id=None):
+    # Seeded from the clock, so a version evicted from the cache doesn't come
+    # back as a number older entries were stored under
+    key = _version_key(branch_id)
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_stats_version(branch_id):
+    """Invalidate cached stats for a branch and for all branches together."""
+    # A new clock value rather than incr(): the file cache's incr is a
+    # read-then-write that can lose a bump to a concurrent one
+    for key in (_version_key(branch_id), _version_key(None)):
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def cached_reservation_stats(date_from=None, date_to=None, branch=None):
+    """reservation_stats(), answered from the cache while nothing has changed."""
+    date_from = date_from or default_date_from()
+    branch_id = getattr(branch, 'pk', branch)
+    if isinstance(branch_id, list):
+        # Valid while none of the branches changed
+        scope = ','.join(map(str, sorted(branch_id))) or 'none'
+        version = '-'.join(str(stats_version(b)) for b in sorted(branch_id))
+    else:
+        scope, version = branch_id or 'all', stats_version(branch_id)
+    key = 'analytics:stats:{}:{}:{}:{}'.format(scope, version, date_from, date_to or '')
+    stats = cache.get(key)
+    if stats is None:
+        stats = reservation_stats(date_from, date_to, branch_id, using=DEFAULT_DB_ALIAS)
+        cache.set(key, stats, cache_timeout())
+    return stats
+
+
+def stats_filters(params):
+    """date_from / date_to / branch from a request's GET params; bad values are ignored."""
+    filters = {}
+    for name in ('date_from', 'date_to'):
+        try:
+            filters[name] = parse_date(params.get(name) or '')
+        except ValueError:
+            filters[name] = None
+    branch = params.get('branch') or ''
+    filters['branch'] = int(branch) if branch.isdigit() else None
+    return filters
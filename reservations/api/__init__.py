@@ -0,0 +1,9 @@
+# reservations/api/__init__.py
+"""
+REST API of the reservations app, mounted once under /api/v1/ (see urls.py).
+
+serializers.py  request/response shapes
+filters.py      branch / date range / status filtering shared by the viewsets
+views.py        viewsets and API views
+urls.py         the router plus the non-viewset endpoints
+"""
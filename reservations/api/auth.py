@@ -0,0 +1,63 @@
+# reservations/api/auth.py
+"""
+JWTs that carry the user's role.
+
+Tokens from /api/v1/token/ hold `role`, `profile_id` and `branches` (the
+branches a staff member is limited to, null for all) next to the user id.
+RoleTokenAuthentication trusts those claims: it neither loads the User nor
+the Profile, and the API's permission checks (roles.request_role) answer from
+the token. Refreshing issues an access token with the claims read afresh, so
+a role change reaches API clients within ACCESS_TOKEN_LIFETIME.
+
+Tokens issued before these claims existed still work; for them the user is
+loaded as before.
+"""
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..roles import Role, user_role
+
+
+def add_role_claims(token, role):
+    token['role'] = role.name
+    token['profile_id'] = role.profile_id
+    token['branches'] = role.branch_ids
+    return token
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token (and through it access tokens) with the role claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_role_claims(super().for_user(user), user_role(user))
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)  # rejects inactive accounts
+        refresh = self.token_class(attrs['refresh'])
+        user = User(pk=refresh[api_settings.USER_ID_CLAIM])
+        data['access'] = str(add_role_claims(refresh.access_token, user_role(user)))
+        return data
+
+
+class RoleTokenAuthentication(JWTStatelessUserAuthentication):
+    """JWT authentication answered from the token's claims, without queries."""
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return JWTAuthentication.get_user(self, validated_token)
+        user = super().get_user(validated_token)
+        user._role = Role(validated_token['role'], validated_token['profile_id'],
+                          validated_token['branches'])
+        return user
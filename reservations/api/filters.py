@@ -0,0 +1,30 @@
+# reservations/api/filters.py
+from rest_framework.filters import BaseFilterBackend
+
+from ..analytics import stats_filters
+
+
+def reservation_filters(params):
+    """branch / date_from / date_to / status from query params; bad values are ignored."""
+    filters = stats_filters(params)
+    filters['status'] = params.get('status') or None
+    return filters
+
+
+class ReservationFilter(BaseFilterBackend):
+    """
+    ?branch=&date_from=&date_to=&status= on reservation querysets. Branch and
+    dates are the leading columns of the (branch, date, time) index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filters = reservation_filters(request.query_params)
+        if filters['branch']:
+            queryset = queryset.filter(branch=filters['branch'])
+        if filters['date_from']:
+            queryset = queryset.filter(date__gte=filters['date_from'])
+        if filters['date_to']:
+            queryset = queryset.filter(date__lte=filters['date_to'])
+        if filters['status']:
+            queryset = queryset.filter(status=filters['status'])
+        return queryset
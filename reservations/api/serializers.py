@@ -0,0 +1,106 @@
+# reservations/api/serializers.py
+
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+from ..models import Reservation, Branch, Table, DEFAULT_DURATION
+
+
+class BranchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Branch
+        fields = ['id', 'name', 'slug', 'address', 'timezone']
+
+
+class TableSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Table
+        fields = ['id', 'branch', 'name', 'capacity', 'status']
+
+
+class ReservationSerializer(serializers.ModelSerializer):
+    branch = BranchSerializer(read_only=True)
+
+    class Meta:
+        model = Reservation
+        fields = [
+            'id',
+            'customer',
+            'branch',
+            'table',
+            'party_size',
+            'date',
+            'time',
+            'duration',
+            'status',
+        ]
+
+
+class ReservationRowSerializer:
+    """
+    Read-only ReservationSerializer for list endpoints: same output, but built
+    from .values() rows with plain dict code instead of DRF fields, so no
+    model instances or per-field serializer calls per row.
+    """
+    columns = [
+        'id', 'customer_id', 'branch_id', 'branch__name', 'branch__slug', 'branch__address',
+        'branch__timezone', 'table_id', 'party_size', 'date', 'time', 'duration', 'status',
+    ]
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.columns)
+
+    @property
+    def data(self):
+        return [
+            {
+                'id': row['id'],
+                'customer': row['customer_id'],
+                'branch': {
+                    'id': row['branch_id'],
+                    'name': row['branch__name'],
+                    'slug': row['branch__slug'],
+                    'address': row['branch__address'],
+                    'timezone': row['branch__timezone'],
+                },
+                'table': row['table_id'],
+                'party_size': row['party_size'],
+                'date': row['date'].isoformat(),
+                'time': row['time'].isoformat(),
+                'duration': row['duration'],
+                'status': row['status'],
+            }
+            for row in self.rows
+        ]
+
+
+class BatchReservationSerializer(serializers.Serializer):
+    """One row of a batch booking import; ids are resolved in bulk by the view."""
+    customer = serializers.IntegerField()
+    branch = serializers.IntegerField()
+    party_size = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    time = serializers.TimeField()
+    duration = serializers.IntegerField(min_value=1, required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """Query string of the availability grid endpoint."""
+    branch = serializers.IntegerField()
+    date = serializers.DateField()
+    party_size = serializers.IntegerField(min_value=1)
+    duration = serializers.IntegerField(min_value=1, default=DEFAULT_DURATION)
+
+    def validate_date(self, value):
+        today = timezone.localdate()
+        days = getattr(settings, 'AVAILABILITY_DAYS_AHEAD', 180)
+        if not today <= value <= today + datetime.timedelta(days=days):
+            raise serializers.ValidationError(f"Must be between today and {days} days from now.")
+        return value
@@ -0,0 +1,26 @@
+# reservations/api/urls.py
+from django.urls import path, include
+from rest_framework import routers
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from .views import (
+    AnalyticsViewSet, AvailabilityView, BranchViewSet, ReservationViewSet, TableViewSet,
+)
+from .. import async_views
+
+router = routers.DefaultRouter()
+router.register(r'branches', BranchViewSet, basename='branches')
+router.register(r'tables', TableViewSet, basename='tables')
+router.register(r'reservations', ReservationViewSet, basename='reservations')
+router.register(r'analytics', AnalyticsViewSet, basename='analytics')
+
+urlpatterns = [
+    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('availability/', AvailabilityView.as_view(), name='availability'),
+    path('async/availability/', async_views.availability_check, name='async_availability'),
+    path('async/reservations/', async_views.reservation_create, name='async_reservation_create'),
+    path('async/reservations/<int:pk>/cancel/', async_views.reservation_cancel,
+         name='async_reservation_cancel'),
+    path('', include(router.urls)),
+]
@@ -0,0 +1,177 @@
+# reservations/api/views.py
+
+import datetime
+import hashlib
+
+from rest_framework import viewsets, permissions, status
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.views import APIView
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from ..models import Reservation, Branch, Profile, Table
+from ..allocation import allocate_batch, day_availability
+from ..availability import availability_index
+from ..analytics import cached_reservation_stats
+from ..roles import STAFF_ROLES, branch_scope, request_role
+from .filters import ReservationFilter, reservation_filters
+from .serializers import (
+    ReservationSerializer, ReservationRowSerializer, BranchSerializer, TableSerializer,
+    BatchReservationSerializer, AvailabilityQuerySerializer,
+)
+
+
+class IsStaffMember(permissions.BasePermission):
+    def has_permission(self, request, view):
+        role = request_role(request)
+        return role is not None and role.name in STAFF_ROLES
+
+
+class BranchViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Branch.objects.order_by('name', 'id')
+    serializer_class = BranchSerializer
+    replica_reads = ('list',)
+
+
+class TableViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Table.objects.order_by('branch_id', 'name')
+    serializer_class = TableSerializer
+    replica_reads = ('list',)
+
+    def get_queryset(self):
+        branch = self.request.query_params.get('branch') or ''
+        if branch.isdigit():
+            return self.queryset.filter(branch_id=branch)
+        return self.queryset
+
+
+class ReservationCursorPagination(CursorPagination):
+    # Newest first on the primary key: unique, so cursors never need offsets
+    ordering = '-id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class ReservationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff see every reservation, customers only their own. Lists take
+    ?branch=&date_from=&date_to=&status= and are cursor-paginated.
+    """
+    queryset = Reservation.objects.select_related('branch')
+    serializer_class = ReservationSerializer
+    pagination_class = ReservationCursorPagination
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [ReservationFilter]
+    replica_reads = ('list',)
+
+    def get_queryset(self):
+        role = request_role(self.request)
+        if role.name not in STAFF_ROLES:
+            return self.queryset.filter(customer_id=role.profile_id)
+        if role.branch_ids is not None:
+            return self.queryset.filter(branch_id__in=role.branch_ids)
+        return self.queryset
+
+    def list(self, request, *args, **kwargs):
+        # Fast path: values() rows through ReservationRowSerializer
+        rows = ReservationRowSerializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(ReservationRowSerializer(page).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsStaffMember])
+    def batch(self, request):
+        """Allocate a list of bookings in one go (event bookings, imports)."""
+        serializer = BatchReservationSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+
+        customers = Profile.objects.in_bulk({row['customer'] for row in rows})
+        branches = Branch.objects.in_bulk({row['branch'] for row in rows})
+        permitted = request_role(request).branch_ids
+        errors = {}
+        for i, row in enumerate(rows):
+            if row['customer'] not in customers:
+                errors[i] = {'customer': 'Unknown customer.'}
+            elif row['branch'] not in branches:
+                errors[i] = {'branch': 'Unknown branch.'}
+            elif permitted is not None and row['branch'] not in permitted:
+                errors[i] = {'branch': 'Not one of your branches.'}
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        result = allocate_batch([
+            {**row, 'customer': customers[row['customer']], 'branch': branches[row['branch']]}
+            for row in rows
+        ])
+        waitlisted = set(result.waitlisted)
+        return Response({
+            'confirmed': [
+                {'index': i, 'id': res.pk, 'table': res.table_id}
+                for i, res in enumerate(result.reservations) if i not in waitlisted
+            ],
+            'waitlisted': [
+                {'index': i, 'id': result.reservations[i].pk} for i in result.waitlisted
+            ],
+        }, status=status.HTTP_201_CREATED)
+
+
+class AvailabilityView(APIView):
+    """
+    Every bookable start time of a day for a party:
+    GET /api/v1/availability/?branch=1&date=2025-12-24&party_size=4[&duration=90]
+
+    `grid` has one character per slot from `first`, every `slot_minutes`
+    minutes: "1" when the party can be seated then, "0" when not. It is answered
+    from the availability index, and carries an ETag and Last-Modified so
+    clients polling it get a 304 until a booking changes the day.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = AvailabilityQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        # Checked against the index first, which keeps a warm request free of
+        # database queries; unknown branches never get an index entry
+        if not availability_index.branch_exists(query['branch']):
+            raise Http404("No such branch.")
+        branch = Branch(pk=query['branch'])
+        slots = day_availability(branch, query['date'], query['party_size'], query['duration'])
+
+        first = datetime.time(slots.first // 3600, slots.first // 60 % 60)
+        payload = {
+            'branch': branch.pk,
+            'date': query['date'].isoformat(),
+            'party_size': query['party_size'],
+            'duration': query['duration'],
+            'first': first.strftime('%H:%M'),
+            'slot_minutes': slots.step // 60,
+            'grid': ''.join('1' if free else '0' for free in slots.slots),
+        }
+        etag = '"%s"' % hashlib.md5(repr(sorted(payload.items())).encode()).hexdigest()
+        last_modified = int(slots.last_modified)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(payload)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True,
+                            max_age=getattr(settings, 'AVAILABILITY_MAX_AGE', 5))
+        return response
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    permission_classes = [IsStaffMember]
+    replica_reads = ('list',)
+
+    def list(self, request):
+        """Counts per day, branch and status; ?date_from=&date_to=&branch= narrow them."""
+        filters = reservation_filters(request.query_params)
+        filters.pop('status')
+        filters['branch'] = branch_scope(request_role(request), filters['branch'])
+        return Response(cached_reservation_stats(**filters))
@@ -5,5 +5,6 @@ class ReservationsConfig(AppConfig):
     name = 'reservations'
 
     def ready(self):
-        import reservations.signals  
+        import reservations.signals
+        import reservations.tasks  # registers the background jobs
 
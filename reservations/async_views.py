@@ -0,0 +1,137 @@
+# reservations/async_views.py
+"""
+Async booking API for ASGI deployments (uvicorn/daphne).
+
+Availability checks are answered from the availability index; a warm index
+answers without touching the database or a worker thread, so one process can
+serve many concurrent checks. Index misses use the async ORM (which Django 5.2
+still runs on a thread internally). Under WSGI these views still work; Django
+runs them in an event loop per request.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.utils.dateparse import parse_date, parse_time
+from django.views.decorators.http import require_GET, require_POST
+
+from .allocation import aallocate, abook
+from .availability import availability_index
+from .roles import user_role
+from .waitlist import dequeue, promote_waitlist
+from .models import Branch, Reservation, DEFAULT_DURATION
+
+
+def _booking_params(data):
+    """Validate branch/party_size/date/time/duration; returns (params, errors)."""
+    params, errors = {}, {}
+    for name in ('branch', 'party_size', 'duration'):
+        value = data.get(name)
+        if value in (None, ''):
+            if name != 'duration':
+                errors[name] = 'This field is required.'
+            continue
+        try:
+            params[name] = int(value)
+        except (TypeError, ValueError):
+            errors[name] = 'A whole number is required.'
+            continue
+        if params[name] < 1:
+            errors[name] = 'Must be at least 1.'
+    for name, parse in (('date', parse_date), ('time', parse_time)):
+        try:
+            params[name] = parse(str(data.get(name) or ''))
+        except ValueError:
+            params[name] = None
+        if params[name] is None:
+            errors[name] = f'A valid {name} is required.'
+    params.setdefault('duration', DEFAULT_DURATION)
+    return params, errors
+
+
+async def _branch(params):
+    return await Branch.objects.filter(pk=params['branch']).afirst()
+
+
+@require_GET
+async def availability_check(request):
+    """Which tables a party would get at branch/date/time (nothing is reserved)."""
+    params, errors = _booking_params(request.GET)
+    if errors:
+        return JsonResponse(errors, status=400)
+    # Answered from the index once the branch is loaded, like the tables below
+    if not await availability_index.abranch_exists(params['branch']):
+        return JsonResponse({'branch': 'Unknown branch.'}, status=400)
+
+    tables = await aallocate(Branch(pk=params['branch']), params['party_size'], params['date'], params['time'],
+                             params['duration'])
+    return JsonResponse({'available': bool(tables), 'tables': [t.pk for t in tables]})
+
+
+@require_POST
+async def reservation_create(request):
+    """Book for the logged-in customer; 201 with the result, waitlisted if nothing fits."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid JSON.'}, status=400)
+    params, errors = _booking_params(data)
+    if errors:
+        return JsonResponse(errors, status=400)
+    branch = await _branch(params)
+    if branch is None:
+        return JsonResponse({'branch': 'Unknown branch.'}, status=400)
+
+    # Creates the profile of users from before profiles were automatic
+    role = await sync_to_async(user_role)(user, request.session)
+    reservation = Reservation(
+        customer_id=role.profile_id,
+        branch=branch,
+        party_size=params['party_size'],
+        date=params['date'],
+        time=params['time'],
+        duration=params['duration'],
+        notes=str(data.get('notes') or ''),
+    )
+    tables = await abook(reservation)
+    return JsonResponse({
+        'id': reservation.pk,
+        'status': reservation.status,
+        'tables': [t.pk for t in tables],
+    }, status=201)
+
+
+def _cancel(reservation):
+    """Release a reservation's tables and promote its slot's waitlist, all or nothing."""
+    with transaction.atomic():
+        dequeue(reservation)
+        # Release the tables: unique_table_booking also covers cancelled rows
+        reservation.status = 'cancelled'
+        reservation.table = None
+        reservation.save(update_fields=['status', 'table', 'updated_at'])
+        reservation.joined_tables.clear()
+        return promote_waitlist(reservation.branch, reservation.date, reservation.time)
+
+
+@require_POST
+async def reservation_cancel(request, pk):
+    """Cancel one of the customer's reservations and offer the slot to the waitlist."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    reservation = await (
+        Reservation.objects.select_related('branch')
+        .filter(pk=pk, customer__user_id=user.pk).afirst()
+    )
+    if reservation is None:
+        raise Http404
+    if reservation.status not in ('pending', 'confirmed'):
+        return JsonResponse({'detail': f'A {reservation.status} reservation cannot be cancelled.'},
+                            status=409)
+    promoted = await sync_to_async(_cancel)(reservation)
+    return JsonResponse({'id': reservation.pk, 'status': reservation.status,
+                         'promoted': [res.pk for res in promoted]})
@@ -0,0 +1,451 @@
+# reservations/availability.py
+"""
+In-memory availability index used by the allocation engine.
+
+For every branch we keep its bookable tables sorted best-fit first
+(capacity, pk) and give each one a bit, so the tables that can seat a party
+are one bitmask. For every (branch, date) each table has a sorted interval
+list of its bookings, so "smallest table for N people free from 19:00 to
+20:30" walks the eligible bits in order and does a logarithmic overlap check
+per table.
+
+The index is a per-process cache. It is filled lazily from the database,
+updated from the Reservation/Table signals in signals.py and expires after
+AVAILABILITY_INDEX_TTL seconds so writes made by other worker processes are
+picked up. Expired entries are dropped once per TTL, so memory follows the
+branches and days actually asked about recently. After a restart it is simply
+empty and rebuilt on demand.
+
+Groups of adjacent tables (see floorplan.py) are precomputed per branch as
+bitmasks sorted by total capacity; a large party gets the first group whose
+mask doesn't intersect the tables busy during its stay.
+"""
+import bisect
+import threading
+import time as _time
+
+from django.conf import settings
+
+from .floorplan import connected_combinations
+from .models import Branch, Table, Reservation
+
+
+def index_ttl():
+    return getattr(settings, 'AVAILABILITY_INDEX_TTL', 30)
+
+
+class BranchTables:
+    """Bookable tables of a branch, in best-fit order."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.capacities = [t.capacity for t in tables]
+        self.bits = {t.pk: i for i, t in enumerate(tables)}
+        self.loaded_at = _time.monotonic()
+        self.changed_at = _time.time()
+        self._combos = None
+
+    @property
+    def combos(self):
+        """Connected groups of adjacent tables, computed on first use."""
+        if self._combos is None:
+            combos = connected_combinations(self.tables)
+            self.combo_capacities = [c.capacity for c in combos]
+            self._combos = combos
+        return self._combos
+
+    def tables_in(self, mask):
+        """Tables of a combo mask, largest first (it becomes the reservation's main table)."""
+        found = []
+        while mask:
+            bit = mask & -mask
+            found.append(self.tables[bit.bit_length() - 1])
+            mask ^= bit
+        return found[::-1]
+
+    def eligible_mask(self, party_size):
+        """Bitmask of the tables that can seat party_size."""
+        start = bisect.bisect_left(self.capacities, party_size)
+        return ((1 << len(self.tables)) - 1) >> start << start
+
+
+def to_seconds(time):
+    return time.hour * 3600 + time.minute * 60 + time.second
+
+
+class TableIntervals:
+    """
+    Bookings of one table on one day as (start, end) seconds sorted by start.
+
+    max_length bounds how far back an overlapping booking can start, so an
+    overlap check is two bisects plus the few bookings inside that window.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.entries = []
+        self.max_length = 0
+
+    def add(self, start, end, res_id):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.entries.insert(i, (start, end, res_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, start, res_id):
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.entries) and self.starts[i] == start:
+            if self.entries[i][2] == res_id:
+                del self.starts[i]
+                del self.entries[i]
+                return
+            i += 1
+
+    def overlaps(self, start, end):
+        lo = bisect.bisect_right(self.starts, start - self.max_length)
+        hi = bisect.bisect_left(self.starts, end)
+        return any(entry_end > start for _, entry_end, _ in self.entries[lo:hi])
+
+
+class DayOccupancy:
+    """Interval index of every bookable table for one branch and date."""
+
+    def __init__(self):
+        self.tables = {}
+        self.placements = {}
+        self.loaded_at = _time.monotonic()
+        self.changed_at = _time.time()  # wall clock, for Last-Modified
+
+    def add(self, res_id, time, end_time, table_id, bits):
+        bit = bits.get(table_id)
+        if bit is None:
+            return
+        start = to_seconds(time)
+        self.changed_at = _time.time()
+        self.placements.setdefault(res_id, []).append((bit, start))
+        self.tables.setdefault(bit, TableIntervals()).add(start, to_seconds(end_time), res_id)
+
+    def remove(self, res_id):
+        if res_id in self.placements:
+            self.changed_at = _time.time()
+        for bit, start in self.placements.pop(res_id, ()):
+            self.tables[bit].remove(start, res_id)
+
+    def is_free(self, bit, start, end):
+        intervals = self.tables.get(bit)
+        return intervals is None or not intervals.overlaps(start, end)
+
+    def busy_mask(self, start, end):
+        """Bitmask of the tables that have a booking overlapping start..end."""
+        mask = 0
+        for bit, intervals in self.tables.items():
+            if intervals.overlaps(start, end):
+                mask |= 1 << bit
+        return mask
+
+
+def _tables_query(branch_ids):
+    return Table.objects.filter(branch_id__in=branch_ids, status='available').order_by('capacity', 'pk')
+
+
+def _build_tables(branch_ids, rows):
+    found = {branch_id: [] for branch_id in branch_ids}
+    for table in rows:
+        found[table.branch_id].append(table)
+    return {branch_id: BranchTables(tables) for branch_id, tables in found.items()}
+
+
+def _day_queries(keys):
+    branch_ids = {branch_id for branch_id, _ in keys}
+    dates = {date for _, date in keys}
+    rows = Reservation.objects.filter(
+        branch_id__in=branch_ids, date__in=dates, status__in=Reservation.ACTIVE_STATUSES,
+        table__isnull=False,
+    ).values_list('pk', 'branch_id', 'date', 'time', 'end_time', 'table_id')
+    joined = Reservation.joined_tables.through.objects.filter(
+        reservation__branch_id__in=branch_ids, reservation__date__in=dates,
+        reservation__status__in=Reservation.ACTIVE_STATUSES,
+    ).values_list('reservation_id', 'reservation__branch_id', 'reservation__date',
+                  'reservation__time', 'reservation__end_time', 'table_id')
+    return rows, joined
+
+
+def _build_days(tables_by_branch, keys, rows):
+    days = {key: DayOccupancy() for key in keys}
+    for res_id, branch_id, date, time, end_time, table_id in rows:
+        day = days.get((branch_id, date))
+        if day is not None:
+            day.add(res_id, time, end_time, table_id, tables_by_branch[branch_id].bits)
+    return days
+
+
+def load_tables(branch_ids):
+    """BranchTables for each branch id, in one query."""
+    branch_ids = set(branch_ids)
+    return _build_tables(branch_ids, _tables_query(branch_ids))
+
+
+async def aload_tables(branch_ids):
+    branch_ids = set(branch_ids)
+    return _build_tables(branch_ids, [t async for t in _tables_query(branch_ids)])
+
+
+def load_days(tables_by_branch, keys):
+    """DayOccupancy for each (branch_id, date) key, in two queries."""
+    keys = set(keys)
+    rows, joined = _day_queries(keys)
+    return _build_days(tables_by_branch, keys, [*rows, *joined])
+
+
+async def aload_days(tables_by_branch, keys):
+    keys = set(keys)
+    rows, joined = _day_queries(keys)
+    return _build_days(tables_by_branch, keys, [r async for r in rows] + [r async for r in joined])
+
+
+def best_table(tables, day, party_size, time, end_time):
+    """Smallest table that seats party_size and is free from time to end_time, or None."""
+    start, end = to_seconds(time), to_seconds(end_time)
+    eligible = tables.eligible_mask(party_size)
+    while eligible:
+        bit = (eligible & -eligible).bit_length() - 1
+        if day.is_free(bit, start, end):
+            return tables.tables[bit]
+        eligible &= eligible - 1
+    return None
+
+
+def best_combination(tables, day, party_size, time, end_time):
+    """Smallest group of adjacent tables free from time to end_time that seats party_size."""
+    busy = day.busy_mask(to_seconds(time), to_seconds(end_time))
+    combo = first_free_combo(tables, party_size, busy)
+    return tables.tables_in(combo.mask) if combo else None
+
+
+def slot_grid(tables, day, party_size, first, step, count, duration):
+    """
+    Bitmask of the `count` slot starts (first, first + step, ... in seconds)
+    at which party_size can be seated for `duration` seconds, on one table or
+    a group of adjacent tables.
+
+    One pass over each table's bookings turns them into blocked-slot masks (a
+    booking [a, b) blocks every start s with a - duration < s < b); the grid
+    is then the OR over tables that fit and, for groups, the AND of their
+    tables' masks.
+    """
+    full = (1 << count) - 1
+    free = []
+    for bit in range(len(tables.tables)):
+        blocked = 0
+        intervals = day.tables.get(bit)
+        for start, end, _ in intervals.entries if intervals else ():
+            lo = max(0, (start - duration - first) // step + 1)
+            hi = min(count, -(-(end - first) // step))
+            if lo < hi:
+                blocked |= ((1 << hi) - 1) ^ ((1 << lo) - 1)
+        free.append(full & ~blocked)
+
+    grid = 0
+    eligible = tables.eligible_mask(party_size)
+    while eligible:
+        bit = eligible & -eligible
+        grid |= free[bit.bit_length() - 1]
+        eligible ^= bit
+    if grid == full:
+        return grid
+    combos = tables.combos
+    start = bisect.bisect_left(tables.combo_capacities, party_size)
+    for combo in combos[start:]:
+        together, mask = full, combo.mask
+        while mask:
+            bit = mask & -mask
+            together &= free[bit.bit_length() - 1]
+            mask ^= bit
+        grid |= together
+    return grid
+
+
+def first_free_combo(tables, party_size, busy):
+    """First combo (fewest seats, then fewest tables) that seats party_size and avoids busy."""
+    combos = tables.combos
+    start = bisect.bisect_left(tables.combo_capacities, party_size)
+    for combo in combos[start:]:
+        if not combo.mask & busy:
+            return combo
+    return None
+
+
+class AvailabilityIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._days = {}
+        self._placed = {}  # reservation pk -> (branch_id, date) of its loaded day
+        self._pruned_at = _time.monotonic()
+
+    # ---- loading ----
+
+    def _fresh(self, entry):
+        return entry is not None and _time.monotonic() - entry.loaded_at < index_ttl()
+
+    def _cached_tables(self, branch_id):
+        with self._lock:
+            entry = self._tables.get(branch_id)
+            return entry if self._fresh(entry) else None
+
+    def _prune(self):
+        """Drop expired entries; called with the lock held, does work once per TTL."""
+        now = _time.monotonic()
+        if now - self._pruned_at < index_ttl():
+            return
+        self._pruned_at = now
+        for branch_id in [b for b, entry in self._tables.items() if not self._fresh(entry)]:
+            del self._tables[branch_id]
+        for key in [k for k, entry in self._days.items()
+                    if not self._fresh(entry) or k[0] not in self._tables]:
+            del self._days[key]
+        for res_id in [r for r, key in self._placed.items() if key not in self._days]:
+            del self._placed[res_id]
+
+    def _store_tables(self, branch_id, entry):
+        with self._lock:
+            self._prune()
+            self._tables[branch_id] = entry
+            # Bit numbers changed, so every day of this branch must be rebuilt
+            for key in [k for k in self._days if k[0] == branch_id]:
+                del self._days[key]
+        return entry
+
+    def _cached_day(self, key):
+        with self._lock:
+            entry = self._days.get(key)
+            return entry if self._fresh(entry) else None
+
+    def _store_day(self, key, tables, entry):
+        with self._lock:
+            self._prune()
+            if self._tables.get(key[0]) is tables:
+                self._days[key] = entry
+                for res_id in entry.placements:
+                    self._placed[res_id] = key
+        return entry
+
+    def branch_tables(self, branch_id):
+        return self._cached_tables(branch_id) or self._store_tables(
+            branch_id, load_tables([branch_id])[branch_id]
+        )
+
+    def day(self, branch_id, date):
+        tables = self.branch_tables(branch_id)
+        key = (branch_id, date)
+        return self._cached_day(key) or self._store_day(
+            key, tables, load_days({branch_id: tables}, [key])[key]
+        )
+
+    async def abranch_tables(self, branch_id):
+        return self._cached_tables(branch_id) or self._store_tables(
+            branch_id, (await aload_tables([branch_id]))[branch_id]
+        )
+
+    async def aday(self, branch_id, date):
+        tables = await self.abranch_tables(branch_id)
+        key = (branch_id, date)
+        return self._cached_day(key) or self._store_day(
+            key, tables, (await aload_days({branch_id: tables}, [key]))[key]
+        )
+
+    # ---- queries ----
+
+    def branch_exists(self, branch_id):
+        """Whether there is such a branch; no query while its tables are loaded."""
+        if self._cached_tables(branch_id) is not None:
+            return True
+        return Branch.objects.filter(pk=branch_id).exists()
+
+    async def abranch_exists(self, branch_id):
+        if self._cached_tables(branch_id) is not None:
+            return True
+        return await Branch.objects.filter(pk=branch_id).aexists()
+
+    def free_table(self, branch_id, party_size, date, time, end_time):
+        tables = self.branch_tables(branch_id)
+        day = self.day(branch_id, date)
+        with self._lock:
+            return best_table(tables, day, party_size, time, end_time)
+
+    def free_combination(self, branch_id, party_size, date, time, end_time):
+        tables = self.branch_tables(branch_id)
+        day = self.day(branch_id, date)
+        tables.combos  # precompute outside the lock
+        with self._lock:
+            return best_combination(tables, day, party_size, time, end_time)
+
+    def open_slots(self, branch_id, date, party_size, first, step, count, duration):
+        """slot_grid() for a branch/day plus when that day's picture last changed."""
+        tables = self.branch_tables(branch_id)
+        day = self.day(branch_id, date)
+        tables.combos
+        with self._lock:
+            grid = slot_grid(tables, day, party_size, first, step, count, duration)
+            return grid, max(tables.changed_at, day.changed_at)
+
+    async def afree_table(self, branch_id, party_size, date, time, end_time):
+        tables = await self.abranch_tables(branch_id)
+        day = await self.aday(branch_id, date)
+        with self._lock:
+            return best_table(tables, day, party_size, time, end_time)
+
+    async def afree_combination(self, branch_id, party_size, date, time, end_time):
+        tables = await self.abranch_tables(branch_id)
+        day = await self.aday(branch_id, date)
+        tables.combos
+        with self._lock:
+            return best_combination(tables, day, party_size, time, end_time)
+
+    # ---- maintenance (called from signals) ----
+
+    def _unplace(self, res_id):
+        day = self._days.get(self._placed.pop(res_id, None))
+        if day is not None:
+            day.remove(res_id)
+
+    def reservation_saved(self, reservation):
+        with self._lock:
+            key = self._placed.get(reservation.pk)
+            day = self._days.get(key)
+            if day is not None and len(day.placements.get(reservation.pk, ())) > 1:
+                # Joined tables aren't on the instance; reload that day instead
+                self._days.pop(key)
+            self._unplace(reservation.pk)
+            if reservation.status not in Reservation.ACTIVE_STATUSES or reservation.table_id is None:
+                return
+            key = (reservation.branch_id, reservation.date)
+            tables = self._tables.get(reservation.branch_id)
+            day = self._days.get(key)
+            if tables is not None and day is not None:
+                day.add(reservation.pk, reservation.time, reservation.end_time,
+                        reservation.table_id, tables.bits)
+                self._placed[reservation.pk] = key
+
+    def reservation_deleted(self, res_id):
+        with self._lock:
+            self._unplace(res_id)
+
+    def invalidate(self, branch_id, date=None):
+        with self._lock:
+            if date is not None:
+                self._days.pop((branch_id, date), None)
+                return
+            self._tables.pop(branch_id, None)
+            for key in [k for k in self._days if k[0] == branch_id]:
+                del self._days[key]
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._days.clear()
+            self._placed.clear()
+
+
+availability_index = AvailabilityIndex()
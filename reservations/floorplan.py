@@ -0,0 +1,69 @@
+# reservations/floorplan.py
+"""
+Which tables can be pushed together, based on the Table.x / Table.y floorplan
+coordinates. Two tables are adjacent when their distance is at most
+TABLE_JOIN_DISTANCE; tables without coordinates are never joined.
+"""
+import math
+from collections import namedtuple
+
+from django.conf import settings
+
+Combo = namedtuple('Combo', ['capacity', 'size', 'mask'])
+
+
+def join_distance():
+    return getattr(settings, 'TABLE_JOIN_DISTANCE', 1)
+
+
+def max_joined_tables():
+    return getattr(settings, 'MAX_JOINED_TABLES', 3)
+
+
+def adjacency(tables):
+    """Neighbour bitmask for every position in `tables`."""
+    limit = join_distance()
+    placed = [(i, t.x, t.y) for i, t in enumerate(tables) if t.x is not None and t.y is not None]
+    neighbours = [0] * len(tables)
+    for a, (i, xi, yi) in enumerate(placed):
+        for j, xj, yj in placed[a + 1:]:
+            if math.hypot(xi - xj, yi - yj) <= limit:
+                neighbours[i] |= 1 << j
+                neighbours[j] |= 1 << i
+    return neighbours
+
+
+def connected_combinations(tables, max_size=None):
+    """
+    Every connected group of 2..max_size tables, as Combo tuples sorted by
+    (total capacity, number of tables) so the first free one wastes the fewest
+    seats.
+
+    Enumeration follows the ESU algorithm (Wernicke, 2006): a group is grown
+    from its lowest table and only extended with neighbours that are not
+    already next to the group, so every connected group is produced exactly
+    once.
+    """
+    max_size = max_size or max_joined_tables()
+    neighbours = adjacency(tables)
+    combos = []
+
+    def grow(mask, extension, closed, capacity, size, above):
+        if size > 1:
+            combos.append(Combo(capacity, size, mask))
+        if size == max_size:
+            return
+        while extension:
+            bit = extension & -extension
+            extension ^= bit
+            i = bit.bit_length() - 1
+            exclusive = neighbours[i] & ~closed & above
+            grow(mask | bit, extension | exclusive, closed | neighbours[i],
+                 capacity + tables[i].capacity, size + 1, above)
+
+    for i, table in enumerate(tables):
+        above = ~((1 << (i + 1)) - 1)
+        grow(1 << i, neighbours[i] & above, neighbours[i] | (1 << i), table.capacity, 1, above)
+
+    combos.sort()
+    return combos
@@ -0,0 +1,115 @@
+# reservations/jobs.py
+"""
+A small job queue backed by the Job table, for work that shouldn't hold up a
+request (waitlist promotion, reminder mails, audit records).
+
+enqueue() inserts a row, in the caller's transaction, so a job only becomes
+visible once the write that caused it commits. Workers (`manage.py run_jobs`)
+claim due jobs, run the function registered under the job's name with its
+kwargs, and on an exception put it back with exponential backoff until
+max_attempts is used up. A job whose worker died is picked up again once its
+lock is older than JOB_LOCK_TIMEOUT, so job functions must be safe to run
+twice. An idempotency key makes enqueueing the same piece of work twice a
+no-op.
+
+Task functions live in tasks.py and are registered with @task('name').
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as the job called `name`."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def max_attempts():
+    return getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', 600))
+
+
+def backoff(attempts):
+    """Delay before retry number `attempts`: JOB_RETRY_BACKOFF doubled each time, at most an hour."""
+    base = getattr(settings, 'JOB_RETRY_BACKOFF', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def enqueue(name, key=None, delay=0, **kwargs):
+    """
+    Queue name(**kwargs) to run after `delay` seconds. kwargs must be JSON
+    serializable. With a key, returns the existing job if one was already
+    queued under it.
+    """
+    fields = dict(name=name, kwargs=kwargs, max_attempts=max_attempts(),
+                  run_at=timezone.now() + timedelta(seconds=delay))
+    if key is None:
+        return Job.objects.create(**fields)
+    job, _ = Job.objects.get_or_create(idempotency_key=key, defaults=fields)
+    return job
+
+
+def claim(limit=20):
+    """Mark up to `limit` due jobs as running for this worker and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(
+            Q(status='queued', run_at__lte=now)
+            | Q(status='running', locked_at__lt=now - lock_timeout())
+        ).order_by('run_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        # (SQLite: the IMMEDIATE transaction already keeps other workers out)
+        jobs = list(due[:limit])
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status='running', locked_at=now, attempts=F('attempts') + 1
+        )
+    for job in jobs:
+        job.status, job.locked_at, job.attempts = 'running', now, job.attempts + 1
+    return jobs
+
+
+def run(job):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError(f"No task registered as {job.name!r}")
+        func(**job.kwargs)
+    except Exception:
+        retry = job.attempts < job.max_attempts
+        Job.objects.filter(pk=job.pk).update(
+            status='queued' if retry else 'failed', locked_at=None,
+            run_at=timezone.now() + backoff(job.attempts),
+            last_error=traceback.format_exc()[-4000:],
+        )
+        return False
+    Job.objects.filter(pk=job.pk).update(status='done', locked_at=None, last_error='')
+    return True
+
+
+def run_pending(limit=20):
+    """Claim and run one batch of due jobs. Returns (succeeded, failed)."""
+    results = [run(job) for job in claim(limit)]
+    return results.count(True), results.count(False)
+
+
+def purge(days=None):
+    """Delete finished jobs older than `days` (JOB_KEEP_DAYS); their keys become reusable."""
+    days = days if days is not None else getattr(settings, 'JOB_KEEP_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    return Job.objects.filter(status='done', updated_at__lt=cutoff).delete()[0]
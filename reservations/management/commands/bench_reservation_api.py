@@ -0,0 +1,56 @@
+# reservations/management/commands/bench_reservation_api.py
+import datetime
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reservations.models import Branch, Reservation
+from reservations.api.serializers import ReservationRowSerializer, ReservationSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ReservationSerializer against ReservationRowSerializer on N throwaway "
+        "reservations (created and rolled back in one transaction)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        count = options['rows']
+        with transaction.atomic():
+            rows = Reservation.objects.filter(branch=self.make_rows(count))
+
+            timings = [
+                ("ReservationSerializer, plain queryset",
+                 lambda: ReservationSerializer(rows.all(), many=True).data),
+                ("ReservationSerializer, select_related",
+                 lambda: ReservationSerializer(rows.select_related('branch'), many=True).data),
+                ("ReservationRowSerializer (values)",
+                 lambda: ReservationRowSerializer(ReservationRowSerializer.values(rows)).data),
+            ]
+            results = []
+            for label, run in timings:
+                started = time.perf_counter()
+                data = run()
+                elapsed = time.perf_counter() - started
+                results.append(elapsed)
+                self.stdout.write(f"{label:40} {elapsed:8.2f}s  {len(data) / elapsed:10.0f} rows/s")
+            self.stdout.write(f"Speedup over the plain serializer: {results[0] / results[-1]:.1f}x")
+            transaction.set_rollback(True)
+
+    def make_rows(self, count):
+        branch = Branch.objects.create(name='Bench', slug='bench-serializers')
+        customer = User.objects.create_user('bench-serializers').profile
+        start = datetime.date(2000, 1, 1)
+        Reservation.objects.bulk_create([
+            Reservation(customer=customer, branch=branch, party_size=2,
+                        date=start + datetime.timedelta(days=i // 40),
+                        time=datetime.time(12 + i % 40 // 4, i % 4 * 15),
+                        end_time=datetime.time(23, 0), status='confirmed')
+            for i in range(count)
+        ], batch_size=2000)
+        return branch
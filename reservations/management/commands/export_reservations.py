@@ -0,0 +1,47 @@
+# reservations/management/commands/export_reservations.py
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from reservations.export import FORMATS, export_rows, stream
+from reservations.replicas import read_from_replica
+
+
+def _date(value):
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise CommandError(f"Not a valid date: {value}")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Export reservations as CSV or NDJSON (streamed, constant memory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--branch', type=int)
+        parser.add_argument('--date-from', type=_date)
+        parser.add_argument('--date-to', type=_date)
+        parser.add_argument('--output', '-o', help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        with read_from_replica():
+            rows = export_rows(options['branch'], options['date_from'], options['date_to'])
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        started = time.perf_counter()
+        lines = 0
+        try:
+            for piece in stream(options['format'], rows):
+                out.write(piece)
+                lines += piece.count('\n')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if options['output']:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Wrote {lines} lines to {options['output']} in {elapsed:.1f}s")
@@ -0,0 +1,12 @@
+# reservations/management/commands/rebuild_rollups.py
+from django.core.management.base import BaseCommand
+
+from reservations.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily reservation rollups from the Reservation table."
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild()
+        self.stdout.write(f"Rebuilt {rows} daily rollup rows")
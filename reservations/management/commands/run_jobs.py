@@ -0,0 +1,36 @@
+# reservations/management/commands/run_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reservations.jobs import purge, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (waitlist promotion, reminders, audit records)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Run what is due now and exit (e.g. from cron)")
+        parser.add_argument('--batch', type=int, default=20, help="Jobs claimed at a time")
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        purged = purge()
+        if purged:
+            self.stdout.write(f"Purged {purged} finished jobs")
+        succeeded = failed = 0
+        while True:
+            # What Django does around each request: drop a connection that broke
+            # or outlived CONN_MAX_AGE, so the next query health-checks or reconnects
+            close_old_connections()
+            ok, bad = run_pending(options['batch'])
+            succeeded, failed = succeeded + ok, failed + bad
+            if ok or bad:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(f"Ran {succeeded + failed} jobs ({failed} failed)")
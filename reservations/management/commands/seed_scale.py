@@ -0,0 +1,225 @@
+# reservations/management/commands/seed_scale.py
+"""
+Production-sized synthetic data: a chain of branches with floorplans,
+customers and a year of reservations.
+
+Branches, tables and customers go in with bulk_create. Reservations are
+written with executemany() instead: bulk_create prepares every value of every
+row through its field (~5k rows/s, over half an hour for 10M rows), while
+here each distinct date and time is prepared once and rows are plain tuples.
+
+Every table has six seatings a day (11:00, 13:00, ..., 21:00, each started
+up to 30 minutes late). Whether a seating is booked depends on its
+popularity (dinner over lunch) and the weekday (Friday and Saturday busiest),
+scaled so the total comes out at --reservations. Seatings are two hours apart
+and last at most 120 minutes, so no table is ever double-booked. Past
+reservations are mostly completed, future ones mostly confirmed, with some
+cancellations and a few pending ones queued on the waitlist for a table.
+
+The same options and --seed give the same data. --start defaults to
+--days/2 days ago, so pass it too when runs on different days should match.
+"""
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from reservations import rollups
+from reservations.analytics import bump_stats_version
+from reservations.models import Branch, Profile, Reservation, Table, WaitlistEntry, compute_end_time
+from reservations.waitlist import new_rank
+
+PREFIX = 'scale'
+SEATINGS = [11 * 60, 13 * 60, 15 * 60, 17 * 60, 19 * 60, 21 * 60]  # minutes after midnight
+POPULARITY = [0.45, 0.35, 0.10, 0.50, 0.90, 0.35]
+WEEKDAY_FACTOR = [0.75, 0.80, 0.85, 0.95, 1.25, 1.35, 1.05]  # Monday first
+CAPACITIES = ([2, 4, 6, 8], [30, 45, 15, 10])
+PAST_STATUSES = (['completed', 'cancelled', 'confirmed'], [85, 12, 3])  # confirmed: never closed
+FUTURE_STATUSES = (['confirmed', 'cancelled', 'pending'], [85, 8, 7])
+TABLES_PER_ROW = 8  # neighbours in a row are 1 apart, so they can be pushed together
+# Reservation columns as written by insert(); reservations() yields all but the last four
+COLUMNS = ['customer', 'branch', 'table', 'party_size', 'date', 'time', 'duration', 'end_time',
+           'status', 'notes', 'reminder_sent_at', 'created_at', 'updated_at']
+
+
+def _scale_for(rate):
+    """Popularity multiplier that books `rate` seatings per table and day on average."""
+    def expected(scale):
+        return sum(
+            min(1.0, weight * factor * scale) for factor in WEEKDAY_FACTOR for weight in POPULARITY
+        ) / len(WEEKDAY_FACTOR)
+
+    low, high = 0.0, 100.0
+    for _ in range(50):
+        mid = (low + high) / 2
+        low, high = (mid, high) if expected(mid) < rate else (low, mid)
+    return high
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise CommandError(f"Not a valid date: {value}")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a reproducible chain of branches, tables, customers "
+        "and a year of reservations for scale testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branches', type=int, default=10)
+        parser.add_argument('--tables', type=int, default=30, help="Tables per branch")
+        parser.add_argument('--customers', type=int, default=50_000)
+        parser.add_argument('--reservations', type=int, default=1_000_000,
+                            help="About this many in total (at most 5.5 per table and day)")
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--start', type=_date, help="First day (default: --days/2 days ago)")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=20_000, help="Rows per transaction")
+        parser.add_argument('--password',
+                            help="Password for the seeded customers (default: none, they can't log in)")
+
+    def handle(self, *args, **options):
+        table_days = options['branches'] * options['tables'] * options['days']
+        if table_days <= 0 or options['customers'] <= 0:
+            raise CommandError("--branches, --tables, --customers and --days must be positive")
+        rate = options['reservations'] / table_days
+        if rate > 5.5:
+            raise CommandError(
+                f"{options['reservations']} reservations need more than {table_days} table-days "
+                "allow; raise --branches, --tables or --days"
+            )
+        if Branch.objects.filter(slug__startswith=f'{PREFIX}-').exists():
+            raise CommandError("This database already has seeded data; use a fresh one")
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        tables = self.make_branches(rng, options['branches'], options['tables'])
+        customers = self.make_customers(options['customers'], options['password'], options['batch_size'])
+        self.stdout.write(f"Created {options['branches']} branches, {len(tables)} tables "
+                          f"and {len(customers)} customers")
+
+        start = options['start'] or timezone.localdate() - datetime.timedelta(days=options['days'] // 2)
+        rows = self.reservations(rng, tables, customers, start, options['days'],
+                                 _scale_for(rate), options['reservations'])
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                written += self.insert(batch)
+                if written % (options['batch_size'] * 20) == 0:
+                    rate = written / (time.perf_counter() - started)
+                    self.stdout.write(f"  {written} reservations, {rate:.0f}/s")
+        written += self.insert(batch)
+        branch_ids = {table.branch_id for table in tables}
+        waitlisted = self.waitlist(branch_ids, options['batch_size'])
+
+        # bulk_create skips the signals that normally keep these up to date
+        rollup_rows = rollups.rebuild()
+        for branch_id in branch_ids:
+            bump_stats_version(branch_id)
+        self.stdout.write(f"Wrote {written} reservations ({waitlisted} waitlisted) and "
+                          f"{rollup_rows} rollup rows in {time.perf_counter() - started:.1f}s")
+
+    def insert(self, batch):
+        """Write rows from reservations() in one transaction; returns how many."""
+        count = len(batch)
+        if not batch:
+            return count
+        opts, quote = Reservation._meta, connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(opts.db_table),
+            ', '.join(quote(opts.get_field(name).column) for name in COLUMNS),
+            ', '.join(['%s'] * len(COLUMNS)),
+        )
+        now = opts.get_field('created_at').get_db_prep_save(timezone.now(), connection)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, [row + ('', None, now, now) for row in batch])
+        batch.clear()
+        return count
+
+    def waitlist(self, branch_ids, batch_size):
+        """Queue the pending reservations in the order they were written; returns how many."""
+        pending = Reservation.objects.filter(
+            branch_id__in=branch_ids, status='pending', table__isnull=True,
+        ).order_by('pk').values_list('pk', 'branch_id', 'date', 'time')
+        rows = list(pending)
+        # Ranks end now, so parties queued later still go behind them (see waitlist.py)
+        first = new_rank() - len(rows)
+        WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(reservation_id=pk, branch_id=branch_id, date=date, time=time, rank=first + i)
+            for i, (pk, branch_id, date, time) in enumerate(rows)
+        ], batch_size=batch_size)
+        return len(rows)
+
+    def make_branches(self, rng, count, per_branch):
+        branches = Branch.objects.bulk_create([
+            Branch(name=f"Branch {i + 1}", slug=f"{PREFIX}-{i + 1}", address=f"{i + 1} Scale Street")
+            for i in range(count)
+        ])
+        return Table.objects.bulk_create([
+            Table(branch=branch, name=f"T{i + 1}", capacity=rng.choices(*CAPACITIES)[0],
+                  x=i % TABLES_PER_ROW, y=i // TABLES_PER_ROW * 3)
+            for branch in branches for i in range(per_branch)
+        ], batch_size=1000)
+
+    def make_customers(self, count, password, batch_size):
+        """Profile ids of `count` new customers (one hash for all: hashing is the slow part)."""
+        hashed = make_password(password)
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f"{PREFIX}-customer-{i + 1}", first_name=f"Customer {i + 1}",
+                     email=f"{PREFIX}-customer-{i + 1}@example.com", password=hashed)
+                for i in range(count)
+            ], batch_size=batch_size)
+            profiles = Profile.objects.bulk_create(
+                [Profile(user=user) for user in users], batch_size=batch_size
+            )
+        return [profile.pk for profile in profiles]
+
+    def reservations(self, rng, tables, customers, start, days, scale, limit):
+        """Reservation rows (see COLUMNS) in date order, at most `limit` of them."""
+        today = timezone.localdate()
+        time_field = Reservation._meta.get_field('time')
+        times = {}  # (start, duration) -> database values for time and end_time
+        made = 0
+        for offset in range(days):
+            date = start + datetime.timedelta(days=offset)
+            db_date = Reservation._meta.get_field('date').get_db_prep_save(date, connection)
+            factor = WEEKDAY_FACTOR[date.weekday()]
+            statuses = PAST_STATUSES if date < today else FUTURE_STATUSES
+            for table in tables:
+                for seating, weight in zip(SEATINGS, POPULARITY):
+                    if rng.random() >= weight * factor * scale:
+                        continue
+                    minutes = seating + rng.choice((0, 0, 15, 30))
+                    party_size = rng.randint(max(1, table.capacity - 2), table.capacity)
+                    duration = 120 if party_size >= 6 else 90
+                    if (minutes, duration) not in times:
+                        start_time = datetime.time(minutes // 60, minutes % 60)
+                        times[minutes, duration] = tuple(
+                            time_field.get_db_prep_save(value, connection)
+                            for value in (start_time, compute_end_time(start_time, duration))
+                        )
+                    db_time, db_end_time = times[minutes, duration]
+                    status = rng.choices(*statuses)[0]
+                    yield (
+                        # Frequent guests: low customer indexes come up far more often
+                        customers[int(len(customers) * rng.random() ** 2)],
+                        table.branch_id,
+                        None if status == 'pending' else table.pk,
+                        party_size, db_date, db_time, duration, db_end_time, status,
+                    )
+                    made += 1
+                    if made >= limit:
+                        return
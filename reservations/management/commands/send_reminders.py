@@ -1,30 +1,51 @@
 # reservations/management/commands/send_reminders.py
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from reservations.models import Reservation
-from datetime import timedelta
-from django.core.mail import send_mail
-from django.conf import settings
+from django.utils.dateparse import parse_date
+
+from reservations.jobs import enqueue
+from reservations.reminders import due_now, due_reminders, send_reminders
+
 
 class Command(BaseCommand):
-    help = "Send email reminders for tomorrow's confirmed reservations."
+    help = (
+        "Send email reminders for confirmed reservations starting within "
+        "REMINDER_LEAD_MINUTES (branch local time), or for a whole --date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Remind about every reservation on this day instead")
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Build the messages but don't send or mark anything")
+        parser.add_argument('--enqueue', action='store_true',
+                            help="Queue a background job for the due reminders instead (run_jobs sends them)")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            # One job per 10-minute window, however often cron fires
+            now = timezone.now()
+            window = now.replace(minute=now.minute // 10 * 10, second=0, microsecond=0)
+            job = enqueue('send_reminders', key=f'send_reminders:{window.isoformat()}')
+            self.stdout.write(f"Queued reminders as job {job.pk}")
+            return
+
+        if options['date']:
+            date = parse_date(options['date'])
+            if date is None:
+                raise CommandError(f"Not a valid date: {options['date']}")
+            reservations, label = due_reminders(date), str(date)
+        else:
+            reservations, label = due_now(), "the coming lead time"
 
-    def handle(self, *args, **kwargs):
-        tomorrow = timezone.now().date() + timedelta(days=1)
-        reservations = Reservation.objects.filter(date=tomorrow, status='confirmed')
-        self.stdout.write(f"Found {reservations.count()} reservations for {tomorrow}")
-        for r in reservations:
-            user_email = r.customer.user.email
-            if not user_email:
-                self.stdout.write(f"Skipping {r.pk}: no email")
-                continue
-            subject = f"Reminder: your reservation at {r.branch.name} on {r.date} at {r.time}"
-            body = (
-                f"Hello {r.customer.user.first_name or r.customer.user.username},\n\n"
-                f"This is a reminder for your reservation at {r.branch.name} on {r.date} at {r.time}.\n"
-                "If you need to change or cancel, please visit your reservations page.\n\n"
-                "Thank you!"
-            )
-            # Use send_mail configured in settings (dev: console backend)
-            send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [user_email], fail_silently=False)
-            self.stdout.write(f"Sent reminder to {user_email} for reservation {r.pk}")
+        run = send_reminders(
+            reservations, batch_size=options['batch_size'], workers=options['workers'],
+            dry_run=options['dry_run'], log=self.stderr.write,
+        )
+        verb = "Would send" if options['dry_run'] else "Sent"
+        rate = run.sent / run.seconds if run.seconds else 0
+        self.stdout.write(
+            f"{verb} {run.sent} reminders for {label} ({run.skipped} without email, "
+            f"{run.failed} failed) in {run.seconds:.2f}s, {rate:.0f}/s"
+        )
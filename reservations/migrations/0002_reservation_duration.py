@@ -0,0 +1,34 @@
+import datetime
+
+from django.db import migrations, models
+
+
+def fill_end_time(apps, schema_editor):
+    Reservation = apps.get_model('reservations', 'Reservation')
+    for res in Reservation.objects.only('pk', 'time', 'duration').iterator():
+        start = datetime.datetime.combine(datetime.date.min, res.time)
+        end = start + datetime.timedelta(minutes=res.duration)
+        res.end_time = end.time() if end.date() == start.date() else datetime.time.max
+        res.save(update_fields=['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='duration',
+            field=models.PositiveIntegerField(default=90, help_text='Minutes'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='end_time',
+            field=models.TimeField(default=datetime.time(0, 0), editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_end_time, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_reservation_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='joined_tables',
+            field=models.ManyToManyField(blank=True, related_name='joined_reservations', to='reservations.table'),
+        ),
+    ]
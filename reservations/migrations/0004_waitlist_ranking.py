@@ -0,0 +1,84 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_waitlist(apps, schema_editor):
+    """Give every pending reservation an entry, ranked by when it was made."""
+    Reservation = apps.get_model('reservations', 'Reservation')
+    WaitlistEntry = apps.get_model('reservations', 'WaitlistEntry')
+    for entry in WaitlistEntry.objects.select_related('reservation'):
+        res = entry.reservation
+        entry.branch_id, entry.date, entry.time = res.branch_id, res.date, res.time
+        entry.rank = int(res.created_at.timestamp() * 1_000_000)
+        entry.save(update_fields=['branch', 'date', 'time', 'rank'])
+    missing = Reservation.objects.filter(status='pending', waitlist_entry__isnull=True)
+    WaitlistEntry.objects.bulk_create([
+        WaitlistEntry(reservation=res, branch_id=res.branch_id, date=res.date, time=res.time,
+                      rank=int(res.created_at.timestamp() * 1_000_000))
+        for res in missing.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_reservation_joined_tables'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='waitlistentry',
+            options={'ordering': ['rank', 'pk']},
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='reservations.branch'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='rank',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='time',
+            field=models.TimeField(null=True),
+        ),
+        migrations.RunPython(fill_waitlist, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='reservations.branch'),
+        ),
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='rank',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='time',
+            field=models.TimeField(),
+        ),
+        migrations.RemoveField(
+            model_name='reservation',
+            name='waitlist_position',
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['branch', 'date', 'time', 'rank'], name='reservation_branch__395e82_idx'),
+        ),
+    ]
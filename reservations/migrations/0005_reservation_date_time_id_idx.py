@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_waitlist_ranking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['date', 'time', 'id'], name='reservation_date_34595d_idx'),
+        ),
+    ]
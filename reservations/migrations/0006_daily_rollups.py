@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_rollups(apps, schema_editor):
+    Reservation = apps.get_model('reservations', 'Reservation')
+    DailyRollup = apps.get_model('reservations', 'DailyRollup')
+    rows = Reservation.objects.order_by().values('branch_id', 'date', 'status').annotate(n=Count('pk'))
+    DailyRollup.objects.bulk_create([
+        DailyRollup(branch_id=r['branch_id'], date=r['date'], status=r['status'], count=r['n'])
+        for r in rows.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_reservation_date_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('seated', 'Seated'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='reservations.branch')),
+            ],
+            options={
+                'ordering': ['date', 'branch', 'status'],
+                'indexes': [models.Index(fields=['date', 'branch'], name='reservation_date_09d349_idx')],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'date', 'status'), name='unique_daily_rollup')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
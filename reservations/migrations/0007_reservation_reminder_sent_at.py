@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0006_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0007_reservation_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('reminder_sent_at__isnull', True), ('status', 'confirmed')), fields=['date', 'time'], name='reminder_due_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0009_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='all_branches',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='branches',
+            field=models.ManyToManyField(blank=True, related_name='staff', to='reservations.branch'),
+        ),
+    ]
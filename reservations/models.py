@@ -2,6 +2,7 @@ from django.db import models
 
 # reservations/models.py
 import datetime
+import zoneinfo
 from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
@@ -9,10 +10,31 @@ from django.utils import timezone
 
 ROLE_CHOICES = (('customer','Customer'),('staff','Staff'),('manager','Manager'))
 
+DEFAULT_DURATION = 90  # minutes a party is expected to hold its table
+
+
+def compute_end_time(time, duration):
+    """End of a booking that starts at `time`; capped at midnight of the same day."""
+    start = datetime.datetime.combine(datetime.date.min, time)
+    end = start + datetime.timedelta(minutes=duration)
+    if end.date() != start.date():
+        return datetime.time.max
+    return end.time()
+
+def branch_zone(name):
+    try:
+        return zoneinfo.ZoneInfo(name) if name else timezone.get_default_timezone()
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return timezone.get_default_timezone()
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='customer')
     phone = models.CharField(max_length=30, blank=True)
+    # Staff work at every branch unless all_branches is off; then only at
+    # `branches` (which may be none at all)
+    all_branches = models.BooleanField(default=True)
+    branches = models.ManyToManyField('Branch', blank=True, related_name='staff')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -28,6 +50,11 @@ class Branch(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def zoneinfo(self):
+        """The branch's timezone; the site's TIME_ZONE if unset or unknown."""
+        return branch_zone(self.timezone)
+
 class Table(models.Model):
     """
     Table in a branch. We include x,y coordinates for a floorplan UI later.
@@ -64,24 +91,37 @@ class Reservation(models.Model):
         ('seated', 'Seated'),
         ('completed', 'Completed'),
     )
+    # Statuses that hold a table (or a claim on one) for their slot; a seated
+    # party keeps its table until it is marked completed
+    ACTIVE_STATUSES = ('pending', 'confirmed', 'seated')
 
     customer = models.ForeignKey(Profile, on_delete=models.CASCADE, limit_choices_to={'role':'customer'}, related_name='reservations')
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='reservations')
     table = models.ForeignKey(Table, null=True, blank=True, on_delete=models.SET_NULL, related_name='reservations')
+    # Extra tables pushed together with `table` for parties no single table can seat
+    joined_tables = models.ManyToManyField(Table, blank=True, related_name='joined_reservations')
     party_size = models.PositiveIntegerField()
     date = models.DateField()
     time = models.TimeField()
+    duration = models.PositiveIntegerField(default=DEFAULT_DURATION, help_text="Minutes")
+    # Derived from time + duration on save so overlap checks can run in SQL
+    end_time = models.TimeField(editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
+    # Set once the reminder e-mail went out, so reruns of send_reminders skip it
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    waitlist_position = models.PositiveIntegerField(null=True, blank=True)
-
     class Meta:
         indexes = [
             models.Index(fields=['branch','date','time']),
             models.Index(fields=['customer','status']),
+            # keyset order of the staff dashboard
+            models.Index(fields=['date','time','id']),
+            # reminders still to send; rows leave it once reminded
+            models.Index(fields=['date','time'], name='reminder_due_idx',
+                         condition=models.Q(status='confirmed', reminder_sent_at__isnull=True)),
         ]
         # Prevent exact double-booking on same table/time
         constraints = [
@@ -89,26 +129,80 @@ class Reservation(models.Model):
         ]
         ordering = ['-date','time']
 
+    def save(self, *args, **kwargs):
+        self.end_time = compute_end_time(self.time, self.duration)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'time', 'duration'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'end_time'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Where the daily rollups count this row, so a save can move it (see rollups.py)
+        instance._counted_as = instance.rollup_key()
+        return instance
+
+    def rollup_key(self):
+        """(branch_id, date, status) as currently set, or None if any of them is deferred."""
+        key = tuple(self.__dict__.get(f) for f in ('branch_id', 'date', 'status'))
+        return None if None in key else key
+
     def reservation_datetime(self):
-        """Return timezone-aware datetime for scheduled reservation."""
+        """Return timezone-aware datetime for scheduled reservation (in the branch's timezone)."""
         dt = datetime.datetime.combine(self.date, self.time)
         if settings.USE_TZ:
-            return timezone.make_aware(dt)
+            return timezone.make_aware(dt, self.branch.zoneinfo)
         return dt
 
     def __str__(self):
         return f"Res#{self.pk} {self.customer.user.username} {self.date} {self.time} ({self.status})"
 
 class WaitlistEntry(models.Model):
-    """If allocation engine can't find table, we create waitlist entries."""
+    """
+    If allocation engine can't find table, we create waitlist entries.
+
+    Queue order is `rank` within (branch, date, time). Ranks are sparse (see
+    waitlist.py) so entries can be added, removed or moved without touching
+    the rest of the queue.
+    """
     reservation = models.OneToOneField(Reservation, on_delete=models.CASCADE, related_name='waitlist_entry')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    time = models.TimeField()
+    rank = models.BigIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['created_at']
+        ordering = ['rank', 'pk']
+        indexes = [
+            models.Index(fields=['branch', 'date', 'time', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"Waitlist for Res#{self.reservation_id}"
+
+class DailyRollup(models.Model):
+    """
+    Number of reservations per branch, date and status, kept in step with
+    Reservation writes (see rollups.py) so analytics never scan Reservation.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date', 'branch', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'date', 'status'], name='unique_daily_rollup')
+        ]
+        indexes = [
+            models.Index(fields=['date', 'branch']),
+        ]
 
     def __str__(self):
-        return f"Waitlist for Res#{self.reservation.pk}"
+        return f"{self.branch_id} {self.date} {self.status}: {self.count}"
 
 class AuditLog(models.Model):
     """Simple audit trail for operations."""
@@ -120,3 +214,35 @@ class AuditLog(models.Model):
     def __str__(self):
         return f"{self.created_at} - {self.action}"
 
+class Job(models.Model):
+    """
+    A unit of background work for the database-backed queue in jobs.py
+    (run by `manage.py run_jobs`).
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),  # out of attempts
+    )
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict)
+    # Enqueueing the same key twice only creates one job
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f"Job#{self.pk} {self.name} ({self.status})"
@@ -0,0 +1,163 @@
+# reservations/reminders.py
+"""
+Reminder e-mails for upcoming reservations.
+
+Due reservations are read in pk order with their customer and branch joined
+in, turned into messages a batch at a time and handed to a small thread
+pool. Each worker keeps one open mail connection for all of its batches.
+Once a batch is sent its reservations get `reminder_sent_at`, so a run that
+dies halfway (or is simply run again) only sends what is still missing. A
+batch that fails is not marked and is retried on the next run.
+
+Scheduled runs (`send_reminders` without --date, every few minutes from
+cron) pick what has come due: reservations starting within
+REMINDER_LEAD_MINUTES from now in their branch's local time. Branches are
+grouped by timezone and each group gets its own local window; the partial
+reminder_due_idx index only holds unsent confirmed bookings, so a run costs
+what is newly due rather than the whole day.
+"""
+import datetime
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Branch, Reservation, branch_zone
+
+ReminderRun = namedtuple('ReminderRun', ['sent', 'skipped', 'failed', 'seconds'])
+
+
+def due_reminders(date):
+    """Confirmed reservations on `date` that haven't had a reminder yet."""
+    return (
+        Reservation.objects.filter(date=date, status='confirmed', reminder_sent_at__isnull=True)
+        .select_related('customer__user', 'branch')
+        .order_by('pk')
+    )
+
+
+def lead_time():
+    return datetime.timedelta(minutes=getattr(settings, 'REMINDER_LEAD_MINUTES', 24 * 60))
+
+
+def _between(start, end):
+    """Q for reservations starting after `start` and no later than `end` (naive local)."""
+    if start.date() == end.date():
+        return Q(date=start.date(), time__gt=start.time(), time__lte=end.time())
+    return (
+        Q(date=start.date(), time__gt=start.time())
+        | Q(date__gt=start.date(), date__lt=end.date())
+        | Q(date=end.date(), time__lte=end.time())
+    )
+
+
+def due_now(now=None):
+    """Confirmed, unreminded reservations starting within lead_time() in their branch's local time."""
+    now = now or timezone.now()
+    zones = defaultdict(list)
+    for branch_id, name in Branch.objects.values_list('pk', 'timezone'):
+        zones[branch_zone(name)].append(branch_id)
+
+    window = Q(pk__in=[])
+    for zone, branch_ids in zones.items():
+        local = now.astimezone(zone).replace(tzinfo=None)
+        window |= Q(branch_id__in=branch_ids) & _between(local, local + lead_time())
+    return (
+        Reservation.objects.filter(window, status='confirmed', reminder_sent_at__isnull=True)
+        .select_related('customer__user', 'branch')
+        .order_by('pk')
+    )
+
+
+def reminder_message(r):
+    user = r.customer.user
+    subject = f"Reminder: your reservation at {r.branch.name} on {r.date} at {r.time}"
+    body = (
+        f"Hello {user.first_name or user.username},\n\n"
+        f"This is a reminder for your reservation at {r.branch.name} on {r.date} at {r.time}.\n"
+        "If you need to change or cancel, please visit your reservations page.\n\n"
+        "Thank you!"
+    )
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+class _Sender:
+    """Sends batches from worker threads, one mail connection per thread."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def send(self, messages):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = get_connection(fail_silently=False)
+            connection.open()
+            with self.lock:
+                self.connections.append(connection)
+        return connection.send_messages(messages)
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+
+
+def send_reminders(reservations, batch_size=100, workers=4, dry_run=False, log=None):
+    """
+    Send a reminder for every reservation in the queryset and checkpoint each
+    batch. Returns a ReminderRun with counts and elapsed seconds.
+    """
+    started = time.perf_counter()
+    sent = skipped = failed = 0
+    sender = _Sender()
+    batch = []
+    in_flight = {}
+
+    def finish(done):
+        nonlocal sent, failed
+        for future in done:
+            ids = in_flight.pop(future)
+            try:
+                future.result()
+            except Exception as exc:  # leave unmarked; the next run retries them
+                failed += len(ids)
+                if log:
+                    log(f"Batch of {len(ids)} failed: {exc}")
+                continue
+            Reservation.objects.filter(pk__in=ids).update(reminder_sent_at=timezone.now())
+            sent += len(ids)
+
+    def flush(pool):
+        nonlocal sent
+        if dry_run:
+            sent += len(batch)
+        else:
+            future = pool.submit(sender.send, [message for _, message in batch])
+            in_flight[future] = [pk for pk, _ in batch]
+            if len(in_flight) >= workers * 2:  # keep memory bounded
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                finish(done)
+        batch.clear()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for r in reservations.iterator(chunk_size=batch_size):
+                if not r.customer.user.email:
+                    skipped += 1
+                    continue
+                batch.append((r.pk, reminder_message(r)))
+                if len(batch) >= batch_size:
+                    flush(pool)
+            if batch:
+                flush(pool)
+            finish(wait(in_flight).done)
+        finally:
+            pool.shutdown(wait=True)
+            sender.close()
+    return ReminderRun(sent, skipped, failed, time.perf_counter() - started)
@@ -0,0 +1,114 @@
+# reservations/replicas.py
+"""
+Read replicas for the read-heavy pages (dashboards, analytics, exports, API
+lists).
+
+Views opt in with a `replica_reads` class attribute: True for every GET, or
+a tuple of viewset actions such as ('list',). ReplicaRoutingMiddleware
+marks such requests and ReplicaRouter then sends their reads to one replica
+(picked per request). Everything else, and every write, stays on 'default'.
+
+Read-your-writes: once a request writes anything, the rest of it reads from
+the primary again, and so do that client's requests for the next
+DATABASE_REPLICA_PIN_SECONDS (the pin is a cookie), which covers the
+redirect after a booking or cancel landing on a lagging replica. Reads
+inside transaction.atomic() always go to the primary.
+
+Replica aliases come from DATABASE_REPLICA_URLS (see rrm_project/database.py);
+with none configured this is all a no-op.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'rrm_primary'
+
+_state = ContextVar('replica_state', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+
+
+class _State:
+    def __init__(self, use_replica=False, pinned=False):
+        self.use_replica = use_replica
+        self.pinned = pinned
+        self.wrote = False
+        self.alias = random.choice(replicas()) if replicas() else None
+
+
+@contextmanager
+def read_from_replica():
+    """Send reads in this block to a replica (for scripts and commands)."""
+    token = _state.set(_State(use_replica=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or not state.use_replica or state.pinned or state.wrote
+            or state.alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            # Explicit, or Django would follow a replica-loaded instance back
+            return DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # the replicas hold the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return False if db in replicas() else None
+
+
+def _reads_from_replica(view_func, method):
+    if method not in ('GET', 'HEAD'):
+        return False
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    reads = getattr(cls, 'replica_reads', False)
+    if isinstance(reads, bool):
+        return reads
+    actions = getattr(view_func, 'actions', None) or {}  # DRF viewsets
+    return actions.get(method.lower()) in reads
+
+
+class ReplicaRoutingMiddleware:
+    """Tracks per request whether reads may go to a replica (see module docstring)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _state.set(_State(pinned=PIN_COOKIE in request.COOKIES))
+        try:
+            response = self.get_response(request)
+            if _state.get().wrote and replicas():
+                response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds(),
+                                    httponly=True, samesite='Lax')
+        finally:
+            _state.reset(token)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if _reads_from_replica(view_func, request.method):
+            _state.get().use_replica = True
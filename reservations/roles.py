@@ -0,0 +1,122 @@
+# reservations/roles.py
+"""
+A user's role, profile id and branches without a Profile query on every
+request.
+
+request_role(request) resolves them once per request (memoized on the user
+object) and keeps them in the user's session, so later requests only do a
+cache lookup. Saving a Profile bumps a per-user version in the cache
+(signals.py) and session entries stored under an older version are reloaded.
+Entries are also reloaded after ROLE_SESSION_SECONDS, which bounds how long a
+role change can go unnoticed if the version is evicted or the cache is
+configured per process.
+
+API requests with a JWT carry the same facts as token claims instead (see
+api/auth.py).
+"""
+import time
+from collections import namedtuple
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY as AUTH_SESSION_KEY
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+
+from .models import Profile
+
+SESSION_KEY = '_rrm_role'
+STAFF_ROLES = ('staff', 'manager')
+
+# branch_ids: the branches a staff member is limited to (maybe none), None for all
+Role = namedtuple('Role', ['name', 'profile_id', 'branch_ids'], defaults=[None])
+
+
+def session_seconds():
+    return getattr(settings, 'ROLE_SESSION_SECONDS', 300)
+
+
+def _version_key(user_id):
+    return f'roles:version:{user_id}'
+
+
+def bump_role_version(user_id):
+    """Make sessions reload this user's role."""
+    cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def _load(user):
+    profile = user._state.fields_cache.get('profile')
+    if profile is None:
+        profile = Profile.objects.filter(user_id=user.pk).only('pk', 'role', 'all_branches').first()
+    if profile is None:  # users from before profiles were created automatically
+        profile = Profile.objects.create(user=user)
+    branch_ids = None
+    if profile.role == 'staff' and not profile.all_branches:
+        branch_ids = sorted(profile.branches.values_list('pk', flat=True))
+    return Role(profile.role, profile.pk, branch_ids)
+
+
+def user_role(user, session=None):
+    """
+    Role of an authenticated user (None for anonymous ones). Pass the
+    request's session to read and store it there; it is only used when it
+    is logged in as this user.
+    """
+    if not user.is_authenticated:
+        return None
+    role = getattr(user, '_role', None)
+    if role is not None:
+        return role
+
+    if session is not None and session.get(AUTH_SESSION_KEY) != str(user.pk):
+        session = None  # e.g. token-authenticated API calls
+    version = cache.get(_version_key(user.pk))
+    entry = session.get(SESSION_KEY) if session is not None else None
+    if entry and entry[3] == version and entry[4] > time.time():
+        role = Role(*entry[:3])
+    else:
+        role = _load(user)
+        if session is not None:
+            session[SESSION_KEY] = [*role, version, time.time() + session_seconds()]
+    user._role = role
+    return role
+
+
+def request_role(request):
+    """user_role() for a request's user, cached in its session."""
+    return user_role(request.user, getattr(request, 'session', None))
+
+
+def branch_scope(role, branch_id=None):
+    """
+    What a staff read asking for `branch_id` (None for every branch) may
+    cover: that branch, or for staff limited to some branches, the list of
+    them when no branch was asked for. PermissionDenied for other branches.
+    """
+    if role.branch_ids is None:
+        return branch_id
+    if branch_id is None:
+        return role.branch_ids
+    if branch_id not in role.branch_ids:
+        raise PermissionDenied("Not one of your branches.")
+    return branch_id
+
+
+def role_required(*roles):
+    """View decorator: let through users with one of `roles`, send others to the login page."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            role = request_role(request)
+            if role is None or role.name not in roles:
+                return redirect_to_login(request.get_full_path())
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def user_role_context(request):
+    """Template context processor: `user_role` for the navigation."""
+    return {'user_role': request_role(request)}
@@ -0,0 +1,115 @@
+# reservations/rollups.py
+"""
+Daily reservation counts per (branch, date, status) in DailyRollup.
+
+Every Reservation write moves its row between counts in the same
+transaction as the write: single saves and deletes through the signals in
+signals.py, bulk writes (batch allocation, waitlist promotion) by calling
+apply() themselves. `manage.py rebuild_rollups` recomputes the table from
+scratch if it ever drifts (e.g. after a raw SQL fix).
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import DailyRollup, Reservation
+
+KEY_FIELDS = (('branch', 'branch_id'), ('date', 'date'), ('status', 'status'))
+
+
+def apply(deltas):
+    """Add deltas ({(branch_id, date, status): change}) to the rollup counts."""
+    missing = {}
+    for key, delta in deltas.items():
+        # A decrement with no row left to take it from is dropped: the rows
+        # are gone when their branch is being deleted (the cascade removes
+        # them before the branch's reservations), and a new row for it would
+        # point at the branch on its way out.
+        if delta and not _bump(key, delta) and delta > 0:
+            missing[key] = delta
+    if missing:
+        # First count for the day: create the rows (a concurrent write may beat
+        # us to it, hence ignore_conflicts) and add to them like any other.
+        DailyRollup.objects.bulk_create([
+            DailyRollup(branch_id=branch_id, date=date, status=status, count=0)
+            for branch_id, date, status in missing
+        ], ignore_conflicts=True)
+        for key, delta in missing.items():
+            _bump(key, delta)
+
+
+def _bump(key, delta):
+    branch_id, date, status = key
+    return DailyRollup.objects.filter(
+        branch_id=branch_id, date=date, status=status
+    ).update(count=F('count') + delta)
+
+
+def added(reservations):
+    """Count freshly bulk-created reservations."""
+    apply(Counter(res.rollup_key() for res in reservations))
+    for res in reservations:
+        res._counted_as = res.rollup_key()
+
+
+def moved(reservations, old_status):
+    """Recount reservations bulk-updated from old_status to their current status."""
+    deltas = Counter()
+    for res in reservations:
+        deltas[(res.branch_id, res.date, old_status)] -= 1
+        deltas[res.rollup_key()] += 1
+        res._counted_as = res.rollup_key()
+    apply(deltas)
+
+
+def saved(reservation, before, update_fields=None):
+    """
+    Move a saved reservation from `before` (its key before the save, None if
+    it is new) to what was written. Fields left out of update_fields keep
+    their old value.
+    """
+    after = []
+    for i, (name, attname) in enumerate(KEY_FIELDS):
+        written = update_fields is None or name in update_fields or attname in update_fields
+        value = reservation.__dict__.get(attname) if written else None
+        after.append(before[i] if value is None and before is not None else value)
+    after = tuple(after)
+    if before != after:
+        deltas = Counter({after: 1})
+        if before is not None:
+            deltas[before] -= 1
+        apply(deltas)
+    reservation._counted_as = after
+
+
+def deleted(reservation):
+    key = getattr(reservation, '_counted_as', None) or reservation.rollup_key()
+    if key is not None:
+        apply({key: -1})
+
+
+def counted_as(reservation):
+    """The key a stored reservation is counted under; one query if it wasn't loaded."""
+    key = getattr(reservation, '_counted_as', None)
+    if key is None:
+        key = (
+            Reservation.objects.filter(pk=reservation.pk)
+            .values_list('branch_id', 'date', 'status').first()
+        )
+    return key
+
+
+def rebuild():
+    """Recompute every rollup from Reservation. Returns the number of rows written."""
+    rows = (
+        Reservation.objects.order_by().values('branch_id', 'date', 'status')
+        .annotate(n=Count('pk'))
+    )
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        created = DailyRollup.objects.bulk_create([
+            DailyRollup(branch_id=r['branch_id'], date=r['date'], status=r['status'], count=r['n'])
+            for r in rows.iterator()
+        ], batch_size=500)
+    return len(created)
@@ -1,13 +1,93 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Profile
+from .models import Profile, Reservation, Table
+from .availability import availability_index
+from . import rollups
+from .analytics import bump_stats_version
+from .roles import bump_role_version
 
 @receiver(post_save, sender=User)
 def ensure_user_profile(sender, instance, created, **kwargs):
+    # Only new users: checking on every save cost a query per login. Older
+    # users without a profile get one from roles.user_role() when first seen.
     if created:
         Profile.objects.create(user=instance)
-    else:
-        # ensure profile exists for existing users
-        if not hasattr(instance, 'profile'):
-            Profile.objects.create(user=instance)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def role_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_role_version(user_id))
+
+
+@receiver(m2m_changed, sender=Profile.branches.through)
+def role_branches_changed(sender, instance, action, pk_set=None, **kwargs):
+    if action == 'pre_clear' and not isinstance(instance, Profile):
+        # post_clear has no pk_set, so note whose branch this was beforehand
+        instance._cleared_staff = list(instance.staff.values_list('user_id', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Profile):
+        user_ids = [instance.user_id]
+    elif action == 'post_clear':
+        user_ids = instance.__dict__.pop('_cleared_staff', [])
+    else:  # edited from the branch side
+        user_ids = list(Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+    transaction.on_commit(lambda: [bump_role_version(user_id) for user_id in user_ids])
+
+
+# ---- availability index upkeep ----
+# Applied once the write is committed (immediately in autocommit), so a
+# rolled back transaction never leaks into the index.
+
+@receiver(post_save, sender=Reservation)
+def index_reservation_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: availability_index.reservation_saved(instance))
+
+
+@receiver(post_delete, sender=Reservation)
+def index_reservation_deleted(sender, instance, **kwargs):
+    res_id = instance.pk  # cleared on the instance once the delete finishes
+    transaction.on_commit(lambda: availability_index.reservation_deleted(res_id))
+
+
+@receiver(m2m_changed, sender=Reservation.joined_tables.through)
+def index_joined_tables_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Reservation):
+        transaction.on_commit(
+            lambda: availability_index.invalidate(instance.branch_id, instance.date)
+        )
+
+
+@receiver([post_save, post_delete], sender=Table)
+def index_table_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: availability_index.invalidate(instance.branch_id))
+
+
+# ---- daily rollups ----
+# Written inside the reservation's own transaction, so they roll back with it.
+
+@receiver(pre_save, sender=Reservation)
+def rollup_before_save(sender, instance, **kwargs):
+    instance._rollup_before = None if instance._state.adding else rollups.counted_as(instance)
+
+
+@receiver(post_save, sender=Reservation)
+def rollup_saved(sender, instance, update_fields=None, **kwargs):
+    rollups.saved(instance, instance._rollup_before, update_fields)
+
+
+@receiver(post_delete, sender=Reservation)
+def rollup_deleted(sender, instance, **kwargs):
+    rollups.deleted(instance)
+
+
+# ---- analytics cache ----
+
+@receiver([post_save, post_delete], sender=Reservation)
+def analytics_changed(sender, instance, **kwargs):
+    branch_id = instance.branch_id
+    transaction.on_commit(lambda: bump_stats_version(branch_id))
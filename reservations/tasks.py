@@ -0,0 +1,28 @@
+# reservations/tasks.py
+"""Background jobs (see jobs.py); imported from apps.py so they get registered."""
+import datetime
+
+from .jobs import task
+from .models import AuditLog, Branch
+from .reminders import due_now, send_reminders
+from .waitlist import promote_waitlist
+
+
+@task('promote_waitlist')
+def promote(branch_id, date, time):
+    branch = Branch.objects.filter(pk=branch_id).first()
+    if branch is not None:
+        promote_waitlist(branch, datetime.date.fromisoformat(date), datetime.time.fromisoformat(time))
+
+
+@task('send_reminders')
+def reminders():
+    run = send_reminders(due_now())
+    if run.failed:
+        # Sent batches are checkpointed, so the retry only sends the rest
+        raise RuntimeError(f"{run.failed} reminders could not be sent")
+
+
+@task('audit')
+def audit(action, user_id=None, extra=None):
+    AuditLog.objects.create(action=action, user_id=user_id, extra=extra)
@@ -1,11 +1,10 @@
 # reservations/urls.py
 
 from django.urls import path, include
-from rest_framework import routers
 
 from .views import (
     HomeView, BranchListView, ReservationCreateView, MyReservationsView,
-    StaffDashboardView, BranchListViewStaff, BranchCreateView, BranchUpdateView,
+    StaffDashboardView, ReservationExportView, BranchListViewStaff, BranchCreateView, BranchUpdateView,
     BranchDeleteView, TableListViewStaff, TableCreateView, TableUpdateView,
     TableDeleteView, MenuItemListViewStaff, MenuItemCreateView,
     MenuItemUpdateView, MenuItemDeleteView, ReservationCancelView,
@@ -13,11 +12,6 @@ from .views import (
 )
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.views import LogoutView
-from .api_views import ReservationViewSet, AnalyticsViewSet
-
-router = routers.DefaultRouter()
-router.register(r'reservations', ReservationViewSet, basename='reservations')
-router.register(r'analytics', AnalyticsViewSet, basename='analytics')
 
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
@@ -27,6 +21,7 @@ urlpatterns = [
     path('reservations/<int:pk>/cancel/', ReservationCancelView.as_view(), name='reservation_cancel'),
 
     path('staff/dashboard/', StaffDashboardView.as_view(), name='staff_dashboard'),
+    path('staff/reservations/export/', ReservationExportView.as_view(), name='reservation_export'),
 
     # Staff CRUD
     path('staff/branches/', BranchListViewStaff.as_view(), name='branches_staff'),
@@ -50,6 +45,5 @@ urlpatterns = [
     path('logout/', LogoutView.as_view(next_page='login'), name='logout'),
 
     # API
-    path('api/v1/', include(router.urls)),
-
+    path('api/v1/', include('reservations.api.urls')),
 ]
@@ -1,13 +1,17 @@
 import json
 from django.shortcuts import render
-from django.views.generic import ListView, CreateView, TemplateView, UpdateView, DeleteView
+from django.views.generic import ListView, CreateView, TemplateView, UpdateView, DeleteView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import redirect
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.contrib.auth.decorators import user_passes_test, login_required
+from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
 
 from .models import Branch, Reservation, Table, MenuItem
 from .forms import (
@@ -16,8 +20,12 @@ from .forms import (
     TableForm,
     MenuItemForm
 )
-from .allocation import find_best_table
-from .waitlist import promote_waitlist
+from .allocation import book
+from .jobs import enqueue
+from .waitlist import with_positions
+from .analytics import cached_reservation_stats, stats_filters
+from .export import FORMATS, export_rows, stream
+from .roles import STAFF_ROLES, branch_scope, request_role, role_required
 
 
 class HomeView(TemplateView):
@@ -38,27 +46,23 @@ class ReservationCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         reservation = form.save(commit=False)
-        reservation.customer = self.request.user.profile
-        branch = form.cleaned_data['branch']
-        party_size = form.cleaned_data['party_size']
-        date = form.cleaned_data['date']
-        time = form.cleaned_data['time']
+        reservation.customer_id = request_role(self.request).profile_id
 
-        table = find_best_table(branch, party_size, date, time)
+        # The audit job is queued in the booking's transaction: both or neither
+        with transaction.atomic():
+            confirmed = bool(book(reservation))
+            enqueue('audit', action='reservation_created', user_id=self.request.user.pk,
+                    extra={'reservation': reservation.pk, 'status': reservation.status})
 
-        if table:
-            reservation.table = table
-            reservation.status = 'confirmed'
+        if confirmed:
             messages.success(self.request, "Reservation confirmed! 🎉")
         else:
-            reservation.status = 'pending'
             messages.warning(
                 self.request,
                 "No tables available at this time. You were placed on the waitlist."
             )
-
-        reservation.save()
-        return super().form_valid(form)
+        self.object = reservation
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class MyReservationsView(LoginRequiredMixin, ListView):
@@ -67,54 +71,125 @@ class MyReservationsView(LoginRequiredMixin, ListView):
     context_object_name = 'reservations'
 
     def get_queryset(self):
-        return Reservation.objects.filter(customer=self.request.user.profile)
-
-
-def staff_required(user):
-    
-    return user.is_authenticated and user.profile.role in ['staff', 'manager']
+        return with_positions(Reservation.objects.filter(customer_id=request_role(self.request).profile_id))
 
 
 # ----------------------
 # STAFF DASHBOARD
 # ----------------------
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class StaffDashboardView(ListView):
+    """
+    Reservations from today on (or of one ?date=), oldest first, one page at
+    a time. Pages are keyset-based: ?after=<date>,<time>,<id> continues after
+    the last row shown, so a page costs the same however much history exists.
+    """
     model = Reservation
     template_name = 'staff_dashboard.html'
     context_object_name = 'reservations'
+    page_size = 50
+    replica_reads = True
 
     def get_queryset(self):
-        qs = Reservation.objects.all().order_by('date', 'time')
+        qs = (
+            Reservation.objects.select_related('customer__user', 'branch', 'table')
+            .order_by('date', 'time', 'id')
+        )
 
         branch = self.request.GET.get('branch')
-        if branch:
+        branch = int(branch) if branch and branch.isdigit() else None
+        branch = branch_scope(request_role(self.request), branch)
+        if isinstance(branch, list):
+            qs = qs.filter(branch_id__in=branch)
+        elif branch:
             qs = qs.filter(branch__id=branch)
 
-        date = self.request.GET.get('date')
+        date = _parse(parse_date, self.request.GET.get('date'))
         if date:
             qs = qs.filter(date=date)
+        else:
+            qs = qs.filter(date__gte=timezone.localdate())
 
-        return qs
+        after = self.cursor()
+        if after:
+            day, time, pk = after
+            qs = qs.filter(
+                Q(date__gt=day) | Q(date=day, time__gt=time) | Q(date=day, time=time, id__gt=pk)
+            )
+
+        # One extra row tells us whether there is a next page
+        return qs[:self.page_size + 1]
+
+    def cursor(self):
+        """(date, time, id) from ?after=, or None when missing or malformed."""
+        parts = (self.request.GET.get('after') or '').split(',')
+        if len(parts) != 3 or not parts[2].isdigit():
+            return None
+        day, time = _parse(parse_date, parts[0]), _parse(parse_time, parts[1])
+        if day is None or time is None:
+            return None
+        return day, time, int(parts[2])
 
     def get_context_data(self, **kwargs):
+        rows = list(self.object_list)
+        page = rows[:self.page_size]
+        kwargs['object_list'] = page
         context = super().get_context_data(**kwargs)
         context['branches'] = Branch.objects.all()
+        permitted = request_role(self.request).branch_ids
+        if permitted is not None:
+            context['branches'] = context['branches'].filter(pk__in=permitted)
+        if len(rows) > self.page_size:
+            last = page[-1]
+            params = self.request.GET.copy()
+            params['after'] = f"{last.date.isoformat()},{last.time.isoformat()},{last.pk}"
+            context['next_query'] = params.urlencode()
+        if self.cursor():
+            params = self.request.GET.copy()
+            del params['after']
+            context['first_query'] = params.urlencode()
         return context
 
 
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
+class ReservationExportView(View):
+    """
+    Streams reservation history:
+    ?format=csv|ndjson&branch=&date_from=&date_to= (all optional, CSV by default).
+    """
+    replica_reads = True
+
+    def get(self, request):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in FORMATS:
+            return HttpResponseBadRequest("format must be csv or ndjson")
+        filters = stats_filters(request.GET)
+        filters['branch'] = branch_scope(request_role(request), filters['branch'])
+        rows = export_rows(**filters)
+        response = StreamingHttpResponse(stream(fmt, rows), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="reservations.{fmt}"'
+        return response
+
+
+def _parse(parser, value):
+    try:
+        return parser(value or '')
+    except ValueError:
+        return None
+
+
 # ----------------------
 # BRANCH CRUD
 # ----------------------
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class BranchListViewStaff(ListView):
     model = Branch
     template_name = 'branch_list_staff.html'
     context_object_name = 'branches'
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class BranchCreateView(CreateView):
     model = Branch
     form_class = BranchForm
@@ -122,7 +197,7 @@ class BranchCreateView(CreateView):
     success_url = reverse_lazy('branches_staff')
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class BranchUpdateView(UpdateView):
     model = Branch
     form_class = BranchForm
@@ -130,7 +205,7 @@ class BranchUpdateView(UpdateView):
     success_url = reverse_lazy('branches_staff')
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class BranchDeleteView(DeleteView):
     model = Branch
     template_name = 'branch_confirm_delete.html'
@@ -141,7 +216,7 @@ class BranchDeleteView(DeleteView):
 # TABLE CRUD
 # ----------------------
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class TableListViewStaff(ListView):
     model = Table
     template_name = 'table_list_staff.html'
@@ -160,7 +235,7 @@ class TableListViewStaff(ListView):
         return context
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class TableCreateView(CreateView):
     model = Table
     form_class = TableForm
@@ -168,7 +243,7 @@ class TableCreateView(CreateView):
     success_url = reverse_lazy('tables_staff')
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class TableUpdateView(UpdateView):
     model = Table
     form_class = TableForm
@@ -176,7 +251,7 @@ class TableUpdateView(UpdateView):
     success_url = reverse_lazy('tables_staff')
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class TableDeleteView(DeleteView):
     model = Table
     template_name = 'table_confirm_delete.html'
@@ -187,7 +262,7 @@ class TableDeleteView(DeleteView):
 # MENU CRUD
 # ----------------------
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class MenuItemListViewStaff(ListView):
     model = MenuItem
     template_name = 'menu_list_staff.html'
@@ -206,7 +281,7 @@ class MenuItemListViewStaff(ListView):
         return context
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class MenuItemCreateView(CreateView):
     model = MenuItem
     form_class = MenuItemForm
@@ -214,7 +289,7 @@ class MenuItemCreateView(CreateView):
     success_url = reverse_lazy('menu_staff')
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class MenuItemUpdateView(UpdateView):
     model = MenuItem
     form_class = MenuItemForm
@@ -222,7 +297,7 @@ class MenuItemUpdateView(UpdateView):
     success_url = reverse_lazy('menu_staff')
 
 
-@method_decorator(user_passes_test(staff_required), name='dispatch')
+@method_decorator(role_required(*STAFF_ROLES), name='dispatch')
 class MenuItemDeleteView(DeleteView):
     model = MenuItem
     template_name = 'menu_confirm_delete.html'
@@ -239,46 +314,46 @@ class ReservationCancelView(DeleteView):
     template_name = 'reservation_cancel_confirm.html'
     success_url = reverse_lazy('my_reservations')
 
-    def delete(self, request, *args, **kwargs):
-        reservation = self.get_object()
-        branch = reservation.branch
-        date = reservation.date
-        time = reservation.time
-
-        response = super().delete(request, *args, **kwargs)
-
-        promote_waitlist(branch, date, time)
+    def form_valid(self, form):
+        # DeleteView routes POST through form_valid (delete() is no longer called)
+        reservation = self.object
+        pk = reservation.pk
+
+        # Offering the freed table to the waitlist happens in the background;
+        # the jobs commit with the delete, so neither happens without the other
+        with transaction.atomic():
+            response = super().form_valid(form)
+            enqueue('promote_waitlist', key=f'promote_waitlist:{pk}', branch_id=reservation.branch_id,
+                    date=reservation.date.isoformat(), time=reservation.time.isoformat())
+            enqueue('audit', action='reservation_cancelled', user_id=self.request.user.pk,
+                    extra={'reservation': pk})
         return response
 
-@method_decorator(user_passes_test(lambda u: u.is_authenticated and u.profile.role == 'manager'), name='dispatch')
+@method_decorator(role_required('manager'), name='dispatch')
 class ManagerAnalyticsView(LoginRequiredMixin, TemplateView):
     template_name = "manager_analytics.html"
+    replica_reads = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Reservations per day
-        daily = (
-            Reservation.objects.values('date')
-            .annotate(count=Count('id'))
-            .order_by('date')
-        )
+        filters = stats_filters(self.request.GET)
+        stats = cached_reservation_stats(**filters)
 
-        context['dates'] = [d['date'].strftime("%Y-%m-%d") for d in daily]
-        context['daily_counts'] = [d['count'] for d in daily]
+        # Reservations per day
+        context['dates'] = [d['date'].strftime("%Y-%m-%d") for d in stats['per_day']]
+        context['daily_counts'] = [d['count'] for d in stats['per_day']]
 
         # Reservations per branch
-        branch_data = (
-            Reservation.objects.values('branch__name')
-            .annotate(count=Count('id'))
-        )
-
-        context['branch_names'] = [b['branch__name'] for b in branch_data]
-        context['branch_counts'] = [b['count'] for b in branch_data]
+        context['branch_names'] = [b['branch__name'] for b in stats['per_branch']]
+        context['branch_counts'] = [b['count'] for b in stats['per_branch']]
 
         # Status overview
-        context['confirmed_count'] = Reservation.objects.filter(status='confirmed').count()
-        context['pending_count'] = Reservation.objects.filter(status='pending').count()
-        context['cancelled_count'] = Reservation.objects.filter(status='cancelled').count()
+        context['confirmed_count'] = stats['per_status']['confirmed']
+        context['pending_count'] = stats['per_status']['pending']
+        context['cancelled_count'] = stats['per_status']['cancelled']
+
+        context['filters'] = filters
+        context['branches'] = Branch.objects.all()
 
         return context
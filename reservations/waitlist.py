@@ -1,24 +1,227 @@
-from .models import Reservation
-from .allocation import find_best_table
+import time as _time
 
-def promote_waitlist(branch, date, time):
-    pending = Reservation.objects.filter(
-        branch=branch,
-        date=date,
-        time=time,
-        status='pending'
-    ).order_by('waitlist_position')
-
-    if not pending.exists():
+from django.db import transaction
+from django.db.models import Case, Count, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Reservation, WaitlistEntry
+from .allocation import lock_branch
+from . import rollups
+from .analytics import bump_stats_version
+from .availability import (
+    availability_index, load_tables, load_days, best_combination, to_seconds,
+)
+
+# ---- queue ----
+# Entries are ordered by a sparse integer rank. New entries get the current
+# time in microseconds, so enqueueing is a single INSERT and lands at the back;
+# moving an entry takes the midpoint of its new neighbours' ranks. Only when
+# two neighbours end up with adjacent ranks is the slot renumbered.
+
+RANK_GAP = 1_000_000
+
+
+def new_rank():
+    return _time.time_ns() // 1000
+
+
+def _slot(obj):
+    return WaitlistEntry.objects.filter(branch_id=obj.branch_id, date=obj.date, time=obj.time)
+
+
+def enqueue(reservation):
+    """Put a pending reservation at the back of its slot's queue."""
+    return WaitlistEntry.objects.create(
+        reservation=reservation, branch_id=reservation.branch_id,
+        date=reservation.date, time=reservation.time, rank=new_rank(),
+    )
+
+
+def enqueue_many(reservations):
+    """Queue several saved reservations at once, keeping their order."""
+    rank = new_rank()
+    return WaitlistEntry.objects.bulk_create([
+        WaitlistEntry(reservation=res, branch_id=res.branch_id, date=res.date, time=res.time,
+                      rank=rank + i)
+        for i, res in enumerate(reservations)
+    ], batch_size=500)
+
+
+def dequeue(reservation):
+    """Take a reservation off the waitlist (no-op if it isn't queued)."""
+    WaitlistEntry.objects.filter(reservation=reservation).delete()
+
+
+def _ahead(**slot):
+    """Correlated COUNT of entries ahead in a slot (NULL when there are none)."""
+    return WaitlistEntry.objects.filter(**slot).values('branch').annotate(n=Count('pk')).values('n')
+
+
+def position(reservation):
+    """1-based place in the queue, or None if the reservation isn't waiting. One query."""
+    found = WaitlistEntry.objects.filter(reservation=reservation).annotate(
+        ahead=Subquery(_ahead(branch=OuterRef('branch'), date=OuterRef('date'),
+                              time=OuterRef('time'), rank__lt=OuterRef('rank')))
+    ).values_list('pk', 'ahead').first()
+    if found is None:
         return None
+    return (found[1] or 0) + 1
+
+
+def with_positions(queryset):
+    """Annotate reservations with `waitlist_position` (None when not queued)."""
+    ahead = _ahead(branch=OuterRef('branch'), date=OuterRef('date'), time=OuterRef('time'),
+                   rank__lt=OuterRef('waitlist_entry__rank'))
+    return queryset.annotate(waitlist_position=Case(
+        When(waitlist_entry__isnull=True, then=None),
+        default=Coalesce(Subquery(ahead), 0) + 1,
+    ))
+
+
+def move_to_front(reservation):
+    """Jump the queue: one UPDATE, rank set just below the current head."""
+    head = _slot(reservation).order_by('rank').values('rank')[:1]
+    WaitlistEntry.objects.filter(reservation=reservation).update(rank=Subquery(head) - RANK_GAP)
+
+
+def move_before(reservation, other):
+    """Move `reservation` to just in front of `other` in the same slot."""
+    for _ in range(2):
+        target = WaitlistEntry.objects.filter(reservation=other).values('rank')
+        neighbours = list(
+            _slot(other).filter(rank__lte=Subquery(target))
+            .exclude(reservation=reservation)
+            .order_by('-rank', '-pk').values_list('rank', flat=True)[:2]
+        )
+        if not neighbours:
+            return
+        upper = neighbours[0]
+        lower = neighbours[1] if len(neighbours) > 1 else upper - 2 * RANK_GAP
+        if upper - lower > 1:
+            WaitlistEntry.objects.filter(reservation=reservation).update(rank=(upper + lower) // 2)
+            return
+        _renumber(other)
+
+
+def _renumber(obj):
+    """
+    Spread a slot's ranks out again; only needed once midpoints run out.
+
+    The new ranks end at the slot's current highest rank (and go below its
+    lowest if the range is too tight), never above it: ranks above it belong to
+    parties enqueued later, which must stay behind everyone already waiting.
+    """
+    entries = list(_slot(obj).order_by('rank', 'pk'))
+    if len(entries) < 2:
+        return
+    low, high = entries[0].rank, entries[-1].rank
+    gap = max(2, min(RANK_GAP, (high - low) // (len(entries) - 1)))
+    base = high - gap * (len(entries) - 1)
+    for i, entry in enumerate(entries):
+        entry.rank = base + i * gap
+    WaitlistEntry.objects.bulk_update(entries, ['rank'], batch_size=500)
+
+
+def promote_waitlist(branch, date, time):
+    """
+    Seat as many waiting parties for the slot as the free tables allow.
+
+    The queue, the tables and the day's occupancy are loaded once, parties are
+    matched to tables in memory and every promotion is written with one
+    bulk_update (plus one DELETE of their queue entries), so the number of
+    queries doesn't depend on the queue length.
+    Returns the promoted reservations in queue order.
+    """
+    with transaction.atomic():
+        # Same lock as new bookings, so a promotion can't race a booking for the freed table
+        lock_branch(branch.pk)
+        entries = list(
+            WaitlistEntry.objects.filter(branch=branch, date=date, time=time,
+                                         reservation__status='pending')
+            .select_related('reservation').order_by('rank', 'pk')
+        )
+        if not entries:
+            return []
+        pending = [entry.reservation for entry in entries]
+
+        tables = load_tables([branch.pk])[branch.pk]
+        day = load_days({branch.pk: tables}, [(branch.pk, date)])[(branch.pk, date)]
+        allowed = [
+            tables.eligible_mask(res.party_size)
+            & ~day.busy_mask(to_seconds(res.time), to_seconds(res.end_time))
+            for res in pending
+        ]
+        seats = match_parties(allowed)
+
+        assigned = {i: [tables.tables[bit]] for i, bit in seats.items()}
+        for i, (found,) in assigned.items():
+            day.add(('promoted', i), pending[i].time, pending[i].end_time, found.pk, tables.bits)
+        # Parties no single free table can seat: try pushing free tables together
+        for i, res in enumerate(pending):
+            if i in assigned:
+                continue
+            found = best_combination(tables, day, res.party_size, res.time, res.end_time)
+            if found:
+                assigned[i] = found
+                for t in found:
+                    day.add(('promoted', i), res.time, res.end_time, t.pk, tables.bits)
+
+        joined = []
+        for i, found in assigned.items():
+            res = pending[i]
+            res.table = found[0]
+            res.status = 'confirmed'
+            res.updated_at = timezone.now()
+            joined.extend((res, t) for t in found[1:])
+
+        promoted = [res for res in pending if res.status == 'confirmed']
+        Reservation.objects.bulk_update(
+            promoted, ['table', 'status', 'updated_at'], batch_size=500
+        )
+        rollups.moved(promoted, 'pending')
+        WaitlistEntry.objects.filter(reservation__in=promoted).delete()
+        Reservation.joined_tables.through.objects.bulk_create([
+            Reservation.joined_tables.through(reservation_id=res.pk, table_id=t.pk)
+            for res, t in joined
+        ])
+        # bulk_update sends no signals
+        transaction.on_commit(lambda: availability_index.invalidate(branch.pk, date))
+        transaction.on_commit(lambda: bump_stats_version(branch.pk))
+        return promoted
+
+
+def match_parties(allowed):
+    """
+    Assign tables to parties; allowed[i] is the bitmask of tables party i may use.
+
+    Parties are taken in queue order and each one is added with an augmenting
+    path (Kuhn's algorithm), re-seating earlier parties if that makes room but
+    never dropping one. That gives the largest number of seated parties while
+    always favouring the front of the queue. Returns {party index: table bit}.
+    """
+    owner = {}  # table bit -> party index
+    taken = [0]
 
-    res = pending.first()
-    table = find_best_table(branch, res.party_size, date, time)
+    def seat(i, visited):
+        free = allowed[i] & ~taken[0]
+        if free:
+            # Take the smallest untaken table before disturbing anyone
+            bit = free & -free
+            taken[0] |= bit
+            owner[bit.bit_length() - 1] = i
+            return True
+        while True:
+            free = allowed[i] & ~visited[0]
+            if not free:
+                return False
+            bit = free & -free
+            visited[0] |= bit
+            table = bit.bit_length() - 1
+            if seat(owner[table], visited):
+                owner[table] = i
+                return True
 
-    if table:
-        res.table = table
-        res.status = 'confirmed'
-        res.waitlist_position = None
-        res.save()
-        return res
-    return None
+    for i in range(len(allowed)):
+        seat(i, [0])
+    return {i: table for table, i in owner.items()}
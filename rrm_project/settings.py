@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 
+from .database import database_settings, replica_settings
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -56,6 +59,7 @@ CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'reservations.replicas.ReplicaRoutingMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,6 +81,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'reservations.roles.user_role_context',
             ],
         },
     },
@@ -88,13 +93,20 @@ WSGI_APPLICATION = 'rrm_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Backend from DATABASE_URL, tuning from DB_PROFILE (web / batch); see
+# rrm_project/database.py for the knobs.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(os.environ, BASE_DIR),
+    **replica_settings(os.environ, BASE_DIR),
 }
 
+# Dashboards, analytics, exports and API lists read from these when set
+# (DATABASE_REPLICA_URLS); see reservations/replicas.py
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['reservations.replicas.ReplicaRouter']
+# After a write, the client reads from the primary for this long
+DATABASE_REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,13 +153,71 @@ MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTs carry role claims, so API requests don't load User/Profile
+        'reservations.api.auth.RoleTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
 }
 
+SIMPLE_JWT = {
+    # Also how long a role change can take to reach an API client
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'TOKEN_OBTAIN_SERIALIZER': 'reservations.api.auth.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'reservations.api.auth.RoleTokenRefreshSerializer',
+}
+
+# Seconds a cached table/occupancy picture is trusted before it is reloaded
+# (bounds drift from bookings made by other worker processes).
+AVAILABILITY_INDEX_TTL = 30
+
+# Tables whose floorplan (x, y) points are at most this far apart can be
+# pushed together for large parties, up to MAX_JOINED_TABLES at a time.
+TABLE_JOIN_DISTANCE = 1
+MAX_JOINED_TABLES = 3
+
+# Bookable start times offered by the availability API
+BOOKING_FIRST_SEATING = '11:00'
+BOOKING_LAST_SEATING = '22:00'
+BOOKING_SLOT_MINUTES = 15
+# The availability API answers for today up to this many days ahead
+AVAILABILITY_DAYS_AHEAD = 180
+# Seconds clients may reuse an availability grid without revalidating
+AVAILABILITY_MAX_AGE = 5
+
+# Analytics cover this many days back unless a date_from is given
+ANALYTICS_DEFAULT_DAYS = 90
+# Upper bound on how long cached analytics live; writes invalidate them sooner
+ANALYTICS_CACHE_TIMEOUT = 300
+
+# Files under .cache/ by default, so every worker process on the machine sees
+# the same invalidations (role changes, analytics versions). Point
+# CACHE_BACKEND / CACHE_LOCATION at e.g. django.core.cache.backends.redis.RedisCache
+# and redis://host:6379/0 when the workers run on more than one machine.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
+}
+
+# How long a role cached in the session is trusted; role changes invalidate it
+# sooner through the cache
+ROLE_SESSION_SECONDS = 300
+
+# Reminders go out this long before a reservation, in the branch's local time.
+# The cron job only picks up what came due since its last run.
+REMINDER_LEAD_MINUTES = 24 * 60
+
+# Background job queue (reservations/jobs.py)
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 30  # seconds before the first retry, doubled after each failure
+JOB_LOCK_TIMEOUT = 600  # a running job is presumed dead after this many seconds
+JOB_KEEP_DAYS = 7
+
 CRONJOBS = [
-    ('0 * * * *', 'django.core.management.call_command', ['send_reminders'])
+    ('*/10 * * * *', 'django.core.management.call_command', ['send_reminders', '--enqueue']),
+    # Without a long-running `manage.py run_jobs` worker, drain the queue every minute
+    ('* * * * *', 'django.core.management.call_command', ['run_jobs', '--once']),
 ]
 
 
@@ -12,5 +12,6 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rrm_project.settings')
+os.environ.setdefault('DB_PROFILE', 'web')
 
 application = get_wsgi_application()